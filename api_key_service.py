@@ -2,14 +2,57 @@
 API Key Management Service
 Handles key generation, validation, and auto-expiration
 """
+import os
 import secrets
 import hashlib
 from datetime import datetime, timedelta
-from typing import Optional
+from threading import Lock
+from typing import Dict, NamedTuple, Optional, Tuple
+from cachetools import TTLCache
+from sqlalchemy import case, update
 from sqlalchemy.orm import Session
 from models import APIKey
 
 
+# last_used_at writes are buffered here and flushed in batches by
+# APIKeyService.flush_usage() instead of committing on every validation
+_LAST_USED_BUFFER: Dict[int, datetime] = {}
+_LAST_USED_LOCK = Lock()
+
+
+# Recently validated keys, keyed by key hash (API_KEY_CACHE_TTL=0 disables).
+# Entries are evicted on revoke/rotate; with several workers a revoked key
+# can stay valid on other workers for up to the TTL.
+API_KEY_CACHE_TTL = int(os.environ.get("API_KEY_CACHE_TTL", "30"))
+_KEY_CACHE = TTLCache(maxsize=50_000, ttl=API_KEY_CACHE_TTL) if API_KEY_CACHE_TTL > 0 else None
+_KEY_CACHE_LOCK = Lock()
+
+
+class ValidatedKey(NamedTuple):
+    """The fields of a valid API key needed by callers of validation"""
+    id: int
+    user_id: int
+    name: str
+    expires_at: Optional[datetime]
+
+
+def evict_cached_key(key_hash: Optional[bytes]):
+    """Drop a key from the validation cache (call when it is revoked)"""
+    if _KEY_CACHE is not None and key_hash is not None:
+        with _KEY_CACHE_LOCK:
+            _KEY_CACHE.pop(key_hash, None)
+
+
+def hash_api_key(key: str) -> bytes:
+    """SHA-256 digest of an API key (only the digest is stored)"""
+    return hashlib.sha256(key.encode()).digest()
+
+
+def mask_api_key(key: str) -> str:
+    """Masked form of an API key that is safe to display"""
+    return f"{key[:8]}...{key[-4:]}"
+
+
 class APIKeyService:
     """Service for managing API keys"""
     
@@ -21,16 +64,9 @@ class APIKeyService:
         Generate a cryptographically secure API key
         Format: prefix_randomstring
         """
-        # Generate 32 bytes of random data
-        random_bytes = secrets.token_bytes(32)
-        
-        # Create a secure hash
-        key_hash = hashlib.sha256(random_bytes).hexdigest()
-        
-        # Add prefix for easy identification
-        api_key = f"sk_{key_hash[:48]}"
-        
-        return api_key
+        # 24 random bytes -> 48 hex chars; the bytes are already uniform,
+        # so hashing them adds no strength
+        return f"sk_{secrets.token_hex(24)}"
     
     def create_api_key(
         self,
@@ -38,9 +74,10 @@ class APIKeyService:
         name: str,
         description: Optional[str] = None,
         expiry_days: int = 90
-    ) -> APIKey:
+    ) -> Tuple[APIKey, str]:
         """
         Create a new API key with auto-expiration
+        Only the key's hash is stored; the plaintext key is returned once
         
         Args:
             user_id: ID of the user creating the key
@@ -49,7 +86,7 @@ class APIKeyService:
             expiry_days: Number of days until key expires (default 90)
         
         Returns:
-            APIKey object with the generated key
+            Tuple of the APIKey object and the plaintext key
         """
         # Generate secure key
         key = self.generate_secure_key()
@@ -59,7 +96,8 @@ class APIKeyService:
         
         # Create API key object
         api_key = APIKey(
-            key=key,
+            key_hash=hash_api_key(key),
+            key_preview=mask_api_key(key),
             name=name,
             description=description,
             user_id=user_id,
@@ -72,19 +110,34 @@ class APIKeyService:
         self.db.commit()
         self.db.refresh(api_key)
         
-        return api_key
+        return api_key, key
     
-    def validate_and_update_usage(self, key: str) -> Optional[APIKey]:
+    def validate_and_update_usage(self, key: str) -> Optional[ValidatedKey]:
         """
-        Validate an API key and update its last_used_at timestamp
+        Validate an API key and record its last_used_at timestamp
         Also checks for expiration
         
         Returns:
-            APIKey object if valid, None if invalid/expired
+            ValidatedKey if valid, None if invalid/expired
         """
-        # Find the key in database
+        key_hash = hash_api_key(key)
+        now = datetime.utcnow()
+        
+        # Serve repeat validations from the cache, no DB round trip
+        if _KEY_CACHE is not None:
+            with _KEY_CACHE_LOCK:
+                cached = _KEY_CACHE.get(key_hash)
+            if cached is not None:
+                if not self.is_key_expired(cached, now):
+                    with _LAST_USED_LOCK:
+                        _LAST_USED_BUFFER[cached.id] = now
+                    return cached
+                # Expired: fall through so the DB row gets deactivated
+                evict_cached_key(key_hash)
+        
+        # Find the key in database by its hash
         api_key = self.db.query(APIKey).filter(
-            APIKey.key == key,
+            APIKey.key_hash == key_hash,
             APIKey.is_active == True
         ).first()
         
@@ -92,24 +145,34 @@ class APIKeyService:
             return None
         
         # Check if expired
-        if self.is_key_expired(api_key):
-            # Deactivate expired key
-            api_key.is_active = False
+        if self.is_key_expired(api_key, now):
+            # Deactivate expired key with a targeted UPDATE
+            self.db.execute(
+                update(APIKey)
+                .where(APIKey.id == api_key.id)
+                .values(is_active=False)
+            )
             self.db.commit()
             return None
         
-        # Update last_used_at timestamp
-        api_key.last_used_at = datetime.utcnow()
-        self.db.commit()
+        # Buffer the last_used_at update (written by flush_usage)
+        with _LAST_USED_LOCK:
+            _LAST_USED_BUFFER[api_key.id] = now
+        
+        validated = ValidatedKey(api_key.id, api_key.user_id, api_key.name, api_key.expires_at)
+        if _KEY_CACHE is not None:
+            with _KEY_CACHE_LOCK:
+                _KEY_CACHE[key_hash] = validated
         
-        return api_key
+        return validated
     
-    def is_key_expired(self, api_key: APIKey) -> bool:
+    def is_key_expired(self, api_key: APIKey, now: Optional[datetime] = None) -> bool:
         """
         Check if an API key is expired
         
         Args:
-            api_key: APIKey object to check
+            api_key: APIKey (or ValidatedKey) to check
+            now: Current time; pass it in when checking many keys at once
         
         Returns:
             True if expired, False otherwise
@@ -117,9 +180,12 @@ class APIKeyService:
         if not api_key.expires_at:
             return False
         
-        return datetime.utcnow() > api_key.expires_at
+        if now is None:
+            now = datetime.utcnow()
+        
+        return now > api_key.expires_at
     
-    def rotate_key(self, old_key: APIKey) -> APIKey:
+    def rotate_key(self, old_key: APIKey) -> Tuple[APIKey, str]:
         """
         Rotate an API key (create new one, deactivate old one)
         Useful for security best practices
@@ -128,21 +194,20 @@ class APIKeyService:
             old_key: The old APIKey object to rotate
         
         Returns:
-            New APIKey object
+            Tuple of the new APIKey object and its plaintext key
         """
         # Deactivate old key
         old_key.is_active = False
         self.db.commit()
+        evict_cached_key(old_key.key_hash)
         
         # Create new key with same settings
-        new_key = self.create_api_key(
+        return self.create_api_key(
             user_id=old_key.user_id,
             name=old_key.name,
             description=f"Rotated from key #{old_key.id}",
             expiry_days=90  # Reset expiration
         )
-        
-        return new_key
     
     def cleanup_expired_keys(self):
         """
@@ -151,14 +216,57 @@ class APIKeyService:
         """
         now = datetime.utcnow()
         
-        expired_keys = self.db.query(APIKey).filter(
-            APIKey.expires_at < now,
-            APIKey.is_active == True
+        # Single bulk UPDATE, no ORM objects loaded
+        result = self.db.execute(
+            update(APIKey)
+            .where(APIKey.expires_at < now, APIKey.is_active == True)
+            .values(is_active=False)
+        )
+        
+        self.db.commit()
+        
+        return result.rowcount
+    
+    def flush_usage(self) -> int:
+        """
+        Write buffered last_used_at timestamps in a single UPDATE
+        Run periodically and on shutdown
+        
+        Returns:
+            Number of keys updated
+        """
+        with _LAST_USED_LOCK:
+            pending = dict(_LAST_USED_BUFFER)
+            _LAST_USED_BUFFER.clear()
+        
+        if not pending:
+            return 0
+        
+        self.db.execute(
+            update(APIKey)
+            .where(APIKey.id.in_(pending.keys()))
+            .values(last_used_at=case(pending, value=APIKey.id))
+        )
+        self.db.commit()
+        
+        return len(pending)
+    
+    def migrate_plaintext_keys(self) -> int:
+        """
+        Replace keys stored in plaintext (created before hashing was
+        introduced) with their hash and masked preview
+        Safe to run on every startup
+        """
+        legacy_keys = self.db.query(APIKey).filter(
+            APIKey.key_hash == None,
+            APIKey.key != None
         ).all()
         
-        for key in expired_keys:
-            key.is_active = False
+        for api_key in legacy_keys:
+            api_key.key_hash = hash_api_key(api_key.key)
+            api_key.key_preview = mask_api_key(api_key.key)
+            api_key.key = None
         
         self.db.commit()
         
-        return len(expired_keys)
+        return len(legacy_keys)
@@ -3,29 +3,66 @@ Authentication and Security Functions
 Simple JWT-based authentication
 """
 import jwt
-from datetime import datetime, timedelta
-from passlib.context import CryptContext
+import bcrypt
+import base64
+import hashlib
+import hmac
+import orjson
+import time
+from threading import Lock
 from typing import Optional
+from cachetools import TTLCache
 
 import os
 
 # Secret key for JWT (from environment variable in production)
 SECRET_KEY = os.environ.get("SECRET_KEY", "your-secret-key-change-this-in-production-12345")
+SECRET_KEY_BYTES = SECRET_KEY.encode()
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def _b64url(data: bytes) -> bytes:
+    """Unpadded base64url encoding used by JWS"""
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+# The HS256 header never changes, so encode it once
+_HEADER_B64 = _b64url(b'{"alg":"HS256","typ":"JWT"}')
+
+# Verified tokens are cached for a few seconds (JWT_CACHE_TTL=0 disables)
+JWT_CACHE_TTL = int(os.environ.get("JWT_CACHE_TTL", "5"))
+_TOKEN_CACHE = TTLCache(maxsize=10_000, ttl=JWT_CACHE_TTL) if JWT_CACHE_TTL > 0 else None
+_TOKEN_CACHE_LOCK = Lock()
+
+# Tokens issued in the last few seconds are handed out again on repeat
+# logins; both would be valid anyway (TOKEN_REUSE_SECONDS=0 disables)
+TOKEN_REUSE_SECONDS = int(os.environ.get("TOKEN_REUSE_SECONDS", "60"))
+_RECENT_TOKENS = TTLCache(maxsize=10_000, ttl=TOKEN_REUSE_SECONDS) if TOKEN_REUSE_SECONDS > 0 else None
+_RECENT_TOKENS_LOCK = Lock()
+
+# Password hashing (bcrypt cost factor, tunable without code changes)
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+if not 4 <= BCRYPT_ROUNDS <= 31:
+    # Fail at startup rather than on the first register call
+    raise ValueError(f"BCRYPT_ROUNDS must be between 4 and 31, got {BCRYPT_ROUNDS}")
+
+# bcrypt only uses the first 72 bytes; passlib truncated silently, keep that behaviour
+BCRYPT_MAX_BYTES = 72
 
 
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt"""
-    return pwd_context.hash(password)
+    hashed = bcrypt.hashpw(password.encode()[:BCRYPT_MAX_BYTES], bcrypt.gensalt(rounds=BCRYPT_ROUNDS))
+    return hashed.decode()
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    try:
+        return bcrypt.checkpw(plain_password.encode()[:BCRYPT_MAX_BYTES], hashed_password.encode())
+    except ValueError:
+        # Malformed or unsupported hash
+        return False
 
 
 def create_access_token(user_id: int) -> str:
@@ -33,15 +70,28 @@ def create_access_token(user_id: int) -> str:
     Create JWT access token
     Used for both web and Android authentication
     """
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    if _RECENT_TOKENS is not None:
+        with _RECENT_TOKENS_LOCK:
+            token = _RECENT_TOKENS.get(user_id)
+        if token is not None:
+            return token
     
-    payload = {
+    now = int(time.time())
+    payload = orjson.dumps({
         "user_id": user_id,
-        "exp": expire,
-        "iat": datetime.utcnow()
-    }
+        "exp": now + ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        "iat": now
+    })
+    
+    # Standard HS256 JWS: header.payload.signature, verifiable by jwt.decode
+    signing_input = _HEADER_B64 + b"." + _b64url(payload)
+    signature = hmac.new(SECRET_KEY_BYTES, signing_input, hashlib.sha256).digest()
+    token = (signing_input + b"." + _b64url(signature)).decode()
+    
+    if _RECENT_TOKENS is not None:
+        with _RECENT_TOKENS_LOCK:
+            _RECENT_TOKENS[user_id] = token
     
-    token = jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
     return token
 
 
@@ -50,15 +100,28 @@ def verify_token(token: str) -> Optional[int]:
     Verify JWT token and return user_id
     Returns None if token is invalid or expired
     """
+    # Key the cache by a digest so raw tokens are never kept in memory
+    cache_key = None
+    if _TOKEN_CACHE is not None:
+        cache_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        with _TOKEN_CACHE_LOCK:
+            user_id = _TOKEN_CACHE.get(cache_key)
+        if user_id is not None:
+            return user_id
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("user_id")
-        
-        if user_id is None:
-            return None
-        
-        return user_id
-    except jwt.ExpiredSignatureError:
+    except jwt.PyJWTError:
+        # Covers ExpiredSignatureError and every other invalid token error
         return None
-    except jwt.JWTError:
+
+    user_id: int = payload.get("user_id")
+    if user_id is None:
         return None
+
+    # Only cache tokens that stay valid for the whole cache TTL
+    if cache_key is not None and payload.get("exp", 0) - time.time() > JWT_CACHE_TTL:
+        with _TOKEN_CACHE_LOCK:
+            _TOKEN_CACHE[cache_key] = user_id
+
+    return user_id
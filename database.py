@@ -2,7 +2,7 @@
 Database Configuration
 Simple SQLite for development, easy to switch to PostgreSQL for production
 """
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -14,12 +14,33 @@ DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./cybersecurity_platfor
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+# In-memory SQLite needs its default single-connection pool
+IS_SQLITE_FILE = IS_SQLITE and DATABASE_URL not in ("sqlite://", "sqlite:///:memory:")
+
 # Create engine
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
+    connect_args={"check_same_thread": False} if IS_SQLITE else {},
+    **({"pool_size": 10, "max_overflow": 20} if IS_SQLITE_FILE else {})
 )
 
+
+if IS_SQLITE_FILE:
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        """
+        WAL lets readers run alongside a writer; NORMAL sync is safe with WAL
+        """
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA cache_size=-64000")  # 64 MB page cache
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB
+        cursor.close()
+
+
 # Create session
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
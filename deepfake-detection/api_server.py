@@ -4,13 +4,73 @@ FastAPI REST API Server for Advanced Deepfake Detection
 
 from fastapi import FastAPI, UploadFile, File
 from fastapi.responses import JSONResponse
+import anyio
+import cv2
+import numpy as np
 import tempfile
+import shutil
 import os
 import uvicorn
 import logging
 
 logger = logging.getLogger(__name__)
 
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+
+def save_upload(file: UploadFile) -> str:
+    """
+    Copy an upload to a temporary file in fixed-size chunks
+    Returns the temporary file path (caller must delete it)
+    """
+    suffix = os.path.splitext(file.filename)[-1]
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        shutil.copyfileobj(file.file, tmp, length=UPLOAD_CHUNK_SIZE)
+        return tmp.name
+
+
+def analyze_upload(file: UploadFile, analyze, kind: str):
+    """
+    Stream an upload to disk, run analyze(path) on it and build the response
+    The temporary file is removed even if the analysis fails
+    """
+    tmp_path = None
+    try:
+        tmp_path = save_upload(file)
+        return JSONResponse(content=analyze(tmp_path))
+
+    except Exception as e:
+        logger.error(f"{kind} analysis failed: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={"success": False, "error": str(e)}
+        )
+
+    finally:
+        if tmp_path is not None:
+            os.unlink(tmp_path)
+
+
+def analyze_image_upload(file: UploadFile, analyze):
+    """
+    Decode an uploaded image in memory and run analyze(image) on it
+    Images are small enough that the temporary file round trip isn't needed
+    """
+    try:
+        data = np.frombuffer(file.file.read(), np.uint8)
+        img = cv2.imdecode(data, cv2.IMREAD_COLOR) if data.size else None
+        if img is None:
+            return JSONResponse(content={"success": False, "error": "Failed to load image"})
+        return JSONResponse(content=analyze(img))
+
+    except Exception as e:
+        logger.error(f"Image analysis failed: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={"success": False, "error": str(e)}
+        )
+
+
 def start_server(detector, host="0.0.0.0", port=8000):
     """
     Start FastAPI server with deepfake detection endpoints
@@ -33,54 +93,19 @@ def start_server(detector, host="0.0.0.0", port=8000):
         """
         Analyze an uploaded image for deepfakes
         """
-        try:
-            # Save uploaded image temporarily
-            suffix = os.path.splitext(file.filename)[-1]
-            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-                tmp.write(await file.read())
-                tmp_path = tmp.name
-
-            # Run detection
-            results = detector.analyze_image(tmp_path)
-
-            # Cleanup
-            os.unlink(tmp_path)
-
-            return JSONResponse(content=results)
-
-        except Exception as e:
-            logger.error(f"Image analysis failed: {e}")
-            return JSONResponse(
-                status_code=500,
-                content={"success": False, "error": str(e)}
-            )
+        # Decode + OpenCV work runs on the threadpool, off the event loop
+        return await anyio.to_thread.run_sync(
+            analyze_image_upload, file, detector.analyze_image
+        )
 
     @app.post("/analyze/video")
     async def analyze_video(file: UploadFile = File(...)):
         """
         Analyze an uploaded video for deepfakes
         """
-        try:
-            # Save uploaded video temporarily
-            suffix = os.path.splitext(file.filename)[-1]
-            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-                tmp.write(await file.read())
-                tmp_path = tmp.name
-
-            # Run detection
-            results = detector.analyze_video(tmp_path)
-
-            # Cleanup
-            os.unlink(tmp_path)
-
-            return JSONResponse(content=results)
-
-        except Exception as e:
-            logger.error(f"Video analysis failed: {e}")
-            return JSONResponse(
-                status_code=500,
-                content={"success": False, "error": str(e)}
-            )
+        return await anyio.to_thread.run_sync(
+            analyze_upload, file, detector.analyze_video, "Video"
+        )
 
     @app.get("/health")
     def health_check():
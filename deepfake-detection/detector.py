@@ -1,10 +1,107 @@
 import numpy as np
 import cv2
+import functools
 import logging
+import queue
+import threading
+from scipy.fft import rfft2
+from utils.sampling import sample_stride, sampled_frames
 
 logger = logging.getLogger(__name__)
 
 
+def cuda_video_available():
+    """
+    True if OpenCV was built with CUDA + cudacodec and a GPU is present
+    """
+    try:
+        return hasattr(cv2, "cudacodec") and cv2.cuda.getCudaEnabledDeviceCount() > 0
+    except cv2.error:
+        return False
+
+
+def read_sampled_frames(cap, stride, max_frames, frames, stop=None):
+    """
+    Producer: put the sampled frames into the frames queue, then a None
+    sentinel
+    """
+    try:
+        for frame in sampled_frames(cap, stride, max_frames, stop):
+            frames.put(frame)
+    finally:
+        frames.put(None)
+
+
+# Frames per vectorized tile in frame_differences / spectrum_magnitudes:
+# the uint8 stack is widened one tile at a time, so temporaries stay
+# bounded (~8 full-HD frames) however many frames are analyzed
+FRAME_CHUNK = 8
+
+
+def frame_differences(frames, chunk=FRAME_CHUNK):
+    """
+    Mean absolute difference (/255) between consecutive frames of an
+    (N, H, W) uint8 stack, vectorized over tiles of chunk frames
+    (widened to int16 per tile so the subtraction can't wrap)
+    """
+    scores = np.empty(max(len(frames) - 1, 0))
+    for start in range(0, len(scores), chunk):
+        stop = min(start + chunk, len(scores))
+        diff = np.abs(frames[start + 1:stop + 1].astype(np.int16) - frames[start:stop])
+        scores[start:stop] = diff.mean(axis=(1, 2)) / 255.0
+    return scores
+
+
+def load_cupy():
+    """
+    Return the cupy module if it is installed and a CUDA device is present
+    """
+    try:
+        import cupy
+        if cupy.cuda.runtime.getDeviceCount() > 0:
+            return cupy
+    except Exception:
+        pass
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def abs_mean_kernel(cupy):
+    """
+    cupy reduction computing mean(|x|) in one kernel: the magnitude is
+    taken as each element is loaded, so no |F| array is materialized
+    """
+    return cupy.ReductionKernel(
+        "T x", "float32 y",
+        "abs(x)", "a + b",
+        "y = a / (_in_ind.size() / _out_ind.size())",
+        "0", "abs_mean",
+        reduce_type="float32"
+    )
+
+
+def spectrum_magnitudes(frames, cupy=None, chunk=FRAME_CHUNK):
+    """
+    Mean FFT magnitude (/1e6) of each frame in an (N, H, W) uint8 stack
+    One batched rfft2 per tile of chunk frames, over the last two axes
+    (real input, so only the non-redundant half of each spectrum is
+    computed), multi-threaded; each tile is widened to float32 on its own.
+    With cupy the FFT runs on cuFFT; cupy caches plans per shape.
+    On the CPU np.abs + mean already streams at memory bandwidth.
+    """
+    magnitudes = np.empty(len(frames))
+    for start in range(0, len(frames), chunk):
+        stop = min(start + chunk, len(frames))
+        if cupy is not None:
+            d = cupy.asarray(frames[start:stop], dtype=cupy.float32)
+            f = cupy.fft.rfft2(d, axes=(-2, -1))
+            magnitudes[start:stop] = cupy.asnumpy(abs_mean_kernel(cupy)(f, axis=(-2, -1)))
+        else:
+            f = rfft2(frames[start:stop].astype(np.float32), axes=(-2, -1), workers=-1)
+            magnitudes[start:stop] = np.abs(f).mean(axis=(-2, -1))
+    return magnitudes / 1e6
+
+
 # ---------------- DETECTOR ---------------- #
 
 class DeepfakeDetector:
@@ -12,6 +109,10 @@ class DeepfakeDetector:
         if config is None:
             config = {}
         self.threshold = config.get("detection_threshold", 0.7)
+        self.max_frames = config.get("max_frames", 30)  # Analyze first N sampled frames
+        self.sample_fps = config.get("sample_fps", 2)  # Frames per second of video to analyze
+        self.use_gpu = config.get("use_gpu", False) and cuda_video_available()
+        self.cupy = load_cupy() if config.get("use_gpu", False) else None
         logger.info(f"DeepfakeDetector initialized (demo mode - no PyTorch)")
 
     def calibrate(self, score):
@@ -38,13 +139,14 @@ class DeepfakeDetector:
     def verdict(self, score):
         return "FAKE" if score > self.threshold else "REAL"
     
-    def analyze_image(self, image_path):
+    def analyze_image(self, image):
         """
         Analyze an image for deepfake detection
+        image is a file path or an already decoded BGR array
         """
         try:
             # Load image
-            img = cv2.imread(image_path)
+            img = image if isinstance(image, np.ndarray) else cv2.imread(image)
             if img is None:
                 return {"success": False, "error": "Failed to load image"}
             
@@ -53,9 +155,7 @@ class DeepfakeDetector:
             
             # Frequency analysis
             gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            f = np.fft.fft2(gray)
-            magnitude = np.abs(f)
-            freq_score = np.mean(magnitude) / 1e6
+            freq_score = spectrum_magnitudes(gray[np.newaxis], self.cupy)[0]
             freq_normalized = min(max(freq_score, 0), 1)
             
             # Final score
@@ -75,43 +175,127 @@ class DeepfakeDetector:
             logger.error(f"Image analysis error: {e}")
             return {"success": False, "error": str(e)}
     
+    def temporal_scores_cpu(self, video_path):
+        """
+        Per-frame temporal differences, decoded on the CPU
+        Decoding runs on a reader thread feeding a bounded queue so it
+        overlaps with the per-frame math here
+        Returns (scores, frames_analyzed, frames), or None if the video
+        can't be opened; frames is the (N, H, W) uint8 grayscale stack
+        """
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            return None
+        
+        stride = sample_stride(cap.get(cv2.CAP_PROP_FPS), self.sample_fps)
+        
+        frames_queue = queue.Queue(maxsize=8)
+        stop = threading.Event()
+        reader = threading.Thread(
+            target=read_sampled_frames,
+            args=(cap, stride, self.max_frames, frames_queue, stop),
+            daemon=True
+        )
+        reader.start()
+        
+        # cvtColor writes into one reused grayscale buffer; the stack is
+        # filled here and all diffs are computed afterwards in one pass
+        gray = None
+        stack = None
+        frame_count = 0
+        
+        try:
+            while True:
+                frame = frames_queue.get()
+                if frame is None:
+                    break
+                
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=gray)
+                if stack is None:
+                    stack = np.empty((self.max_frames,) + gray.shape, dtype=np.uint8)
+                stack[frame_count] = gray
+                frame_count += 1
+        finally:
+            # On error the reader may be blocked on the full queue: stop it
+            # and drain until it exits, then release the capture
+            stop.set()
+            while reader.is_alive():
+                try:
+                    frames_queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            reader.join()
+            cap.release()
+        
+        if stack is None:
+            return [], 0, None
+        frames = stack[:frame_count]
+        return frame_differences(frames), frame_count, frames
+
+    def temporal_scores_gpu(self, video_path):
+        """
+        Per-frame temporal differences with NVDEC decode; frames stay on the GPU
+        (only the sampled grayscale frames are downloaded, for the FFT)
+        Returns (scores, frames_analyzed, frames)
+        """
+        reader = cv2.cudacodec.createVideoReader(video_path)
+        _, fps = reader.get(cv2.CAP_PROP_FPS)
+        stride = sample_stride(fps, self.sample_fps)
+        
+        scores = []
+        prev = None
+        spare = None
+        diff = None
+        stack = None
+        frame_count = 0
+        
+        for frame in sampled_frames(reader, stride, self.max_frames):
+            gray = cv2.cuda.cvtColor(frame, cv2.COLOR_BGRA2GRAY, dst=spare)
+            width, height = gray.size()
+            if stack is None:
+                stack = np.empty((self.max_frames, height, width), dtype=np.uint8)
+            stack[frame_count] = gray.download()
+            if prev is not None:
+                diff = cv2.cuda.absdiff(gray, prev, dst=diff)
+                scores.append(cv2.cuda.sum(diff)[0] / (width * height * 255.0))
+            spare, prev = prev, gray
+            frame_count += 1
+        
+        frames = stack[:frame_count] if stack is not None else None
+        return scores, frame_count, frames
+
     def analyze_video(self, video_path):
         """
         Analyze a video for deepfake detection
         """
         try:
-            cap = cv2.VideoCapture(video_path)
-            if not cap.isOpened():
+            # Temporal consistency analysis (GPU decode when available)
+            result = None
+            if self.use_gpu:
+                try:
+                    result = self.temporal_scores_gpu(video_path)
+                except cv2.error as e:
+                    logger.warning(f"GPU decode failed, falling back to CPU: {e}")
+            if result is None:
+                result = self.temporal_scores_cpu(video_path)
+            if result is None:
                 return {"success": False, "error": "Failed to open video"}
+            scores, frame_count, frames = result
             
             # Get CNN score
             cnn = self.cnn_score()
             
-            # Temporal consistency analysis
-            scores = []
-            prev = None
-            frame_count = 0
-            max_frames = 30  # Analyze first 30 frames
-            
-            while cap.isOpened() and frame_count < max_frames:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                if prev is not None:
-                    diff = np.mean(np.abs(gray - prev)) / 255
-                    scores.append(diff)
-                prev = gray
-                frame_count += 1
-            
-            cap.release()
-            
             # Calculate temporal score
-            temporal = np.mean(scores) if scores else 0.5
+            temporal = np.mean(scores) if len(scores) else 0.5
+            
+            # Frequency analysis over all sampled frames in one batched FFT
+            if frames is not None:
+                frequency = min(max(spectrum_magnitudes(frames, self.cupy).mean(), 0), 1)
+            else:
+                frequency = 0.5
             
             # Final score
-            final = self.final_score(cnn, temporal, 0.5)
+            final = self.final_score(cnn, temporal, frequency)
             verdict = self.verdict(final)
             
             return {
@@ -121,8 +305,10 @@ class DeepfakeDetector:
                 "details": {
                     "cnn_score": float(cnn),
                     "temporal_score": float(temporal),
+                    "frequency_score": float(frequency),
                     "frames_analyzed": frame_count
-                }
+                },
+                "temporal_scores": [float(s) for s in scores]
             }
         except Exception as e:
             logger.error(f"Video analysis error: {e}")
@@ -1,3 +1,4 @@
+import math
 import numpy as np
 import logging
 import wave
@@ -17,9 +18,15 @@ def analyze_voice(path):
             else:
                 data = np.frombuffer(frames, dtype=np.uint8)
         
-        # Simple statistical analysis
-        mean_amplitude = np.mean(np.abs(data))
-        std_amplitude = np.std(data)
+        # Simple statistical analysis: widen once to float32 (np.abs on int16
+        # overflows at -32768) and accumulate in float64; std is taken about
+        # the mean (no E[x^2] - E[x]^2 cancellation with a DC offset)
+        n = max(data.size, 1)
+        d = data.astype(np.float32)
+        mean_amplitude = np.abs(d).sum(dtype=np.float64) / n
+        mean = d.sum(dtype=np.float64) / n
+        d -= np.float32(mean)  # d is our own copy: centre and square in place
+        std_amplitude = math.sqrt(np.square(d, out=d).sum(dtype=np.float64) / n)
         
         # Calculate confidence score (demo - random with slight bias)
         score = np.random.uniform(0.3, 0.8)
@@ -1,12 +1,41 @@
+import os
 import cv2
+import logging
+
+logger = logging.getLogger(__name__)
+
+# YuNet ONNX model (download from the OpenCV model zoo)
+YUNET_MODEL = "face_detection_yunet_2023mar.onnx"
+
 
 class FaceDetector:
     def __init__(self, config=None):
-        self.detector = cv2.CascadeClassifier(
-            cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-        )
+        if config is None:
+            config = {}
+        model_path = config.get("yunet_model", YUNET_MODEL)
+        self.yunet = None
+
+        # Prefer the YuNet CNN detector; fall back to the Haar cascade
+        if hasattr(cv2, "FaceDetectorYN") and os.path.exists(model_path):
+            self.yunet = cv2.FaceDetectorYN.create(model_path, "", (320, 320))
+        else:
+            logger.info("YuNet model not found, using Haar cascade face detector")
+            self.detector = cv2.CascadeClassifier(
+                cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+            )
 
     def detect(self, frame):
+        """
+        Detect faces, returned as (x, y, w, h) boxes
+        """
+        if self.yunet is not None:
+            h, w = frame.shape[:2]
+            self.yunet.setInputSize((w, h))
+            _, faces = self.yunet.detect(frame)
+            if faces is None:
+                return ()
+            return faces[:, :4].astype(int)
+
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         faces = self.detector.detectMultiScale(gray, 1.3, 5)
         return faces
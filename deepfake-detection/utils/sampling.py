@@ -0,0 +1,28 @@
+def sample_stride(fps, sample_fps):
+    """
+    Number of decoded frames per analyzed frame to sample at ~sample_fps
+    """
+    if not fps or fps <= 0 or not sample_fps:
+        return 1
+    return max(1, int(round(fps / sample_fps)))
+
+
+def sampled_frames(reader, stride, max_frames=None, stop=None):
+    """
+    Yield every stride-th frame (up to max_frames) of a cv2.VideoCapture
+    or cudacodec reader
+    grab() only demuxes; frames are decoded by retrieve() when sampled
+    Stops early once the optional stop event is set
+    """
+    index = 0
+    produced = 0
+    while (max_frames is None or produced < max_frames) \
+            and not (stop is not None and stop.is_set()) and reader.grab():
+        index += 1
+        if (index - 1) % stride:
+            continue
+        ret, frame = reader.retrieve()
+        if not ret:
+            break
+        yield frame
+        produced += 1
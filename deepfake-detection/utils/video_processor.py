@@ -1,19 +1,21 @@
 import cv2
 import numpy as np
 import matplotlib.pyplot as plt
+from scipy.fft import rfft2
+from .sampling import sample_stride, sampled_frames
 
-def temporal_scores(video_path):
+def temporal_scores(video_path, sample_fps=2):
     cap = cv2.VideoCapture(video_path)
+    stride = sample_stride(cap.get(cv2.CAP_PROP_FPS), sample_fps)
     scores = []
     prev = None
 
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
+    # Decode (retrieve) only the sampled frames
+    for frame in sampled_frames(cap, stride):
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         if prev is not None:
-            diff = np.mean(np.abs(gray - prev)) / 255
+            # Saturating uint8 |a - b| in one OpenCV pass (no wraparound)
+            diff = cv2.absdiff(gray, prev).mean() / 255.0
             scores.append(diff)
         prev = gray
 
@@ -23,6 +25,7 @@ def temporal_scores(video_path):
 
 def frequency_score(frame):
     gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    f = np.fft.fft2(gray)
+    # Real input: rfft2 computes only the non-redundant half spectrum
+    f = rfft2(gray.astype(np.float32), workers=-1)
     magnitude = np.abs(f)
     return np.mean(magnitude) / 1e6
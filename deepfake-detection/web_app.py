@@ -1,11 +1,12 @@
 import streamlit as st
+import os
 import tempfile
 import cv2
 import numpy as np
 import matplotlib.pyplot as plt
 from detector import DeepfakeDetector
 from utils.audio_processor import analyze_voice
-from utils.video_processor import temporal_scores, frequency_score
+from utils.video_processor import frequency_score
 
 st.set_page_config(
     page_title="Advanced Deepfake Detection",
@@ -16,11 +17,16 @@ st.set_page_config(
 if "mode" not in st.session_state:
     st.session_state.mode = None
 
-detector = DeepfakeDetector({
-    "detection_threshold": 0.7,
-    "selected_model": "mesonet",
-    "enable_ensemble": True
-})
+# Built once per server process, shared across reruns and sessions
+@st.cache_resource
+def get_detector():
+    return DeepfakeDetector({
+        "detection_threshold": 0.7,
+        "selected_model": "mesonet",
+        "enable_ensemble": True
+    })
+
+detector = get_detector()
 
 st.markdown("## 🔍 Advanced Deepfake Detection System")
 
@@ -51,24 +57,27 @@ if st.session_state.mode == "video":
     )
 
     if video:
-        with tempfile.NamedTemporaryFile(delete=False) as f:
-            f.write(video.read())
-            path = f.name
-
         st.video(video)
 
         if st.button("Analyze Video"):
-            with st.spinner("Analyzing video..."):
-                result = detector.analyze_video(path)
+            # VideoCapture needs a path: write the upload only when analyzing
+            # and remove it right after (reruns no longer leak temp files)
+            with tempfile.NamedTemporaryFile(delete=False) as f:
+                f.write(video.getvalue())
+                path = f.name
+            try:
+                with st.spinner("Analyzing video..."):
+                    result = detector.analyze_video(path)
+            finally:
+                os.unlink(path)
 
             if result["success"]:
                 st.success(f"Verdict: {result['verdict']}")
                 st.metric("Confidence", f"{result['confidence']:.2f}")
 
-                # Temporal graph
-                temp = temporal_scores(path)
+                # Temporal graph (per-frame scores from the same decode pass)
                 st.subheader("📊 Temporal Consistency")
-                st.line_chart(temp)
+                st.line_chart(result["temporal_scores"])
 
             else:
                 st.error(result["error"])
@@ -83,16 +92,13 @@ elif st.session_state.mode == "image":
     )
 
     if image:
-        with tempfile.NamedTemporaryFile(delete=False) as f:
-            f.write(image.read())
-            path = f.name
-
-        img = cv2.imread(path)
+        # Decode straight from the upload buffer, no temp file round trip
+        img = cv2.imdecode(np.frombuffer(image.getvalue(), np.uint8), cv2.IMREAD_COLOR)
         st.image(img, channels="BGR")
 
         if st.button("Analyze Image"):
             with st.spinner("Analyzing image..."):
-                result = detector.analyze_image(path)
+                result = detector.analyze_image(img)
 
             if result["success"]:
                 st.success(f"Verdict: {result['verdict']}")
@@ -115,15 +121,13 @@ elif st.session_state.mode == "voice":
     )
 
     if audio:
-        with tempfile.NamedTemporaryFile(delete=False) as f:
-            f.write(audio.read())
-            path = f.name
-
         st.audio(audio)
 
         if st.button("Analyze Voice"):
+            # wave reads the in-memory upload directly, no temp file needed
+            audio.seek(0)
             with st.spinner("Analyzing voice..."):
-                result = analyze_voice(path)
+                result = analyze_voice(audio)
 
             st.success(f"Verdict: {result['verdict']}")
             st.metric("Confidence", f"{result['confidence']:.2f}")
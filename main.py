@@ -2,10 +2,22 @@
 Cybersecurity Platform - Backend API Server
 Serves both Web and Android applications
 """
-from fastapi import FastAPI, Depends, HTTPException, status, Header
+from fastapi import FastAPI, Depends, HTTPException, status, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
+from threading import Lock
+from typing import Optional
+from cachetools import LRUCache
+import anyio
+import asyncio
+import base64
+import hashlib
+import logging
+import orjson
+import os
 import uvicorn
 
 # Import our modules
@@ -13,26 +25,70 @@ from models import (
     User, APIKey, APIKeyCreate, APIKeyResponse, UserCreate, UserLogin,
     Wallet, WalletCreate, WalletResponse, WalletInfo, WalletUnlock,
     SignMessageRequest, SignMessageResponse, VerifySignatureRequest,
-    EncryptMessageRequest, DecryptMessageRequest
+    EncryptMessageRequest, DecryptMessageRequest,
+    BatchSignRequest, BatchSignResponse, BatchDecryptRequest, BatchDecryptResponse
 )
-from database import get_db, engine, Base
+from database import get_db, SessionLocal
 from auth import create_access_token, verify_token, hash_password, verify_password
-from api_key_service import APIKeyService
+from api_key_service import APIKeyService, evict_cached_key
+from migrations import migrate
 from pqc_wallet import pqc_wallet_service
+from sqlalchemy import bindparam, select, update
 from sqlalchemy.orm import Session
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
+
+# Worker threads for sync endpoints. bcrypt releases the GIL, so login and
+# register throughput is capped by this pool size (AnyIO default: 40)
+THREADPOOL_SIZE = int(os.environ.get("THREADPOOL_SIZE", "100"))
+
+# Seconds between writes of buffered API key last_used_at timestamps
+API_KEY_USAGE_FLUSH_INTERVAL = int(os.environ.get("API_KEY_USAGE_FLUSH_INTERVAL", "10"))
+
+
+def flush_api_key_usage():
+    """Write buffered API key usage timestamps to the database"""
+    with SessionLocal() as db:
+        APIKeyService(db).flush_usage()
+
+
+async def flush_api_key_usage_periodically():
+    """Background task that flushes API key usage every few seconds"""
+    while True:
+        await asyncio.sleep(API_KEY_USAGE_FLUSH_INTERVAL)
+        try:
+            await asyncio.to_thread(flush_api_key_usage)
+        except Exception:
+            logger.exception("Failed to flush API key usage")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background tasks and flush pending writes on shutdown"""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    usage_task = asyncio.create_task(flush_api_key_usage_periodically())
+    yield
+    usage_task.cancel()
+    flush_api_key_usage()
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response encoded with orjson (serializes datetime natively)"""
+    
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Cybersecurity Platform API",
     description="Backend API for Web and Android applications",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS to allow both web and mobile access
-import os
 allowed_origins = os.environ.get("CORS_ORIGINS", "http://localhost:3000,http://localhost:5173,http://127.0.0.1:3000").split(",")
 
 app.add_middleware(
@@ -45,11 +101,82 @@ app.add_middleware(
 
 security = HTTPBearer()
 
+# Columns needed to describe an API key (avoids hydrating full ORM rows)
+API_KEY_INFO_COLUMNS = (
+    APIKey.id, APIKey.name, APIKey.description, APIKey.key_preview,
+    APIKey.created_at, APIKey.last_used_at, APIKey.expires_at, APIKey.is_active
+)
+
+# Public wallet columns (skips the encrypted private key blobs)
+WALLET_INFO_COLUMNS = (
+    Wallet.wallet_id, Wallet.kyber_public_key, Wallet.dilithium_public_key,
+    Wallet.created_at, Wallet.last_unlocked_at, Wallet.algorithm, Wallet.is_active
+)
+
+# Hot wallet lookups, built once and bound per request
+ACTIVE_WALLET_INFO_BY_USER = select(*WALLET_INFO_COLUMNS).where(
+    Wallet.user_id == bindparam("user_id"),
+    Wallet.is_active == True
+)
+OWNED_ACTIVE_WALLET = select(Wallet).where(
+    Wallet.wallet_id == bindparam("wallet_id"),
+    Wallet.user_id == bindparam("user_id"),
+    Wallet.is_active == True
+)
+ACTIVE_WALLET_VERIFY_KEY = select(Wallet.wallet_id, Wallet.dilithium_public_key).where(
+    Wallet.wallet_id == bindparam("wallet_id"),
+    Wallet.is_active == True
+)
+
+# Signature verification results keyed by a hash of the public key of the
+# active wallet, the message and the signature (the wallet is looked up on
+# every request, so deactivated or replaced wallets are never answered)
+_VERIFY_RESULTS = LRUCache(maxsize=10_000)
+_VERIFY_RESULTS_LOCK = Lock()
+
 
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
 
+def make_etag(*parts) -> str:
+    """Strong ETag for a response derived from the given values"""
+    digest = hashlib.blake2b(orjson.dumps(parts), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if an If-None-Match header lists the ETag (or *)"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def unlock_data(wallet: Wallet) -> dict:
+    """Wallet fields pqc_wallet_service.unlock_wallet needs"""
+    return {
+        "wallet_id": wallet.wallet_id,
+        "salt": wallet.salt,
+        "version": wallet.version,
+        "encrypted_keys": {
+            "kyber_private": wallet.encrypted_kyber_private,
+            "dilithium_private": wallet.encrypted_dilithium_private,
+            "recovery_seed": wallet.encrypted_recovery_seed
+        }
+    }
+
+
+def touch_wallet(db: Session, wallet_id: int):
+    """Record an unlock with a targeted UPDATE"""
+    db.execute(
+        update(Wallet)
+        .where(Wallet.id == wallet_id)
+        .values(last_unlocked_at=datetime.utcnow())
+    )
+    db.commit()
+
+
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
@@ -64,7 +191,8 @@ def get_current_user(
             detail="Invalid or expired token"
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    # Primary-key lookup (checks the session identity map first)
+    user = db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -85,7 +213,7 @@ def root():
         "status": "online",
         "service": "Cybersecurity Platform API",
         "version": "1.0.0",
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": datetime.utcnow()
     }
 
 
@@ -95,7 +223,7 @@ def health_check():
     return {
         "status": "healthy",
         "database": "connected",
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": datetime.utcnow()
     }
 
 
@@ -177,7 +305,7 @@ def get_current_user_info(current_user: User = Depends(get_current_user)):
         "id": current_user.id,
         "email": current_user.email,
         "username": current_user.username,
-        "created_at": current_user.created_at.isoformat()
+        "created_at": current_user.created_at
     }
 
 
@@ -199,7 +327,7 @@ def generate_api_key(
     api_key_service = APIKeyService(db)
     
     # Generate the API key
-    api_key = api_key_service.create_api_key(
+    api_key, plaintext_key = api_key_service.create_api_key(
         user_id=current_user.id,
         name=key_data.name,
         description=key_data.description,
@@ -208,12 +336,12 @@ def generate_api_key(
     
     return {
         "message": "API key generated successfully",
-        "api_key": api_key.key,  # Only shown once!
+        "api_key": plaintext_key,  # Only shown once!
         "key_id": api_key.id,
         "name": api_key.name,
         "description": api_key.description,
-        "created_at": api_key.created_at.isoformat(),
-        "expires_at": api_key.expires_at.isoformat() if api_key.expires_at else None,
+        "created_at": api_key.created_at,
+        "expires_at": api_key.expires_at,
         "last_used_at": None
     }
 
@@ -228,32 +356,28 @@ def list_api_keys(
     - Shows masked keys for security
     - Works for both web and Android
     """
-    api_key_service = APIKeyService(db)
-    
-    # Get all keys for user
-    keys = db.query(APIKey).filter(
+    # Get all keys for user (only the columns we return)
+    keys = db.query(*API_KEY_INFO_COLUMNS).filter(
         APIKey.user_id == current_user.id,
         APIKey.is_active == True
     ).all()
     
-    result = []
-    for key in keys:
-        # Check if key is expired
-        is_expired = api_key_service.is_key_expired(key)
-        
-        result.append({
-            "key_id": key.id,
-            "name": key.name,
-            "description": key.description,
-            "key_preview": f"{key.key[:8]}...{key.key[-4:]}",  # Masked key
-            "created_at": key.created_at.isoformat(),
-            "last_used_at": key.last_used_at.isoformat() if key.last_used_at else None,
-            "expires_at": key.expires_at.isoformat() if key.expires_at else None,
-            "is_expired": is_expired,
-            "is_active": key.is_active
-        })
-    
-    return result
+    now = datetime.utcnow()
+    
+    return [
+        {
+            "key_id": key_id,
+            "name": name,
+            "description": description,
+            "key_preview": key_preview,  # Masked key
+            "created_at": created_at,
+            "last_used_at": last_used_at,
+            "expires_at": expires_at,
+            "is_expired": expires_at is not None and now > expires_at,
+            "is_active": is_active
+        }
+        for key_id, name, description, key_preview, created_at, last_used_at, expires_at, is_active in keys
+    ]
 
 
 @app.get("/api/keys/{key_id}")
@@ -264,7 +388,7 @@ def get_api_key_details(
 ):
     """Get detailed information about a specific API key"""
     
-    key = db.query(APIKey).filter(
+    key = db.query(*API_KEY_INFO_COLUMNS).filter(
         APIKey.id == key_id,
         APIKey.user_id == current_user.id
     ).first()
@@ -282,10 +406,10 @@ def get_api_key_details(
         "key_id": key.id,
         "name": key.name,
         "description": key.description,
-        "key_preview": f"{key.key[:8]}...{key.key[-4:]}",
-        "created_at": key.created_at.isoformat(),
-        "last_used_at": key.last_used_at.isoformat() if key.last_used_at else None,
-        "expires_at": key.expires_at.isoformat() if key.expires_at else None,
+        "key_preview": key.key_preview,
+        "created_at": key.created_at,
+        "last_used_at": key.last_used_at,
+        "expires_at": key.expires_at,
         "is_expired": is_expired,
         "is_active": key.is_active
     }
@@ -313,6 +437,7 @@ def revoke_api_key(
     # Deactivate the key
     key.is_active = False
     db.commit()
+    evict_cached_key(key.key_hash)
     
     return {
         "message": "API key revoked successfully",
@@ -343,16 +468,16 @@ def rotate_api_key(
     api_key_service = APIKeyService(db)
     
     # Create new key with same settings
-    new_key = api_key_service.rotate_key(old_key)
+    new_key, plaintext_key = api_key_service.rotate_key(old_key)
     
     return {
         "message": "API key rotated successfully",
-        "api_key": new_key.key,  # Only shown once!
+        "api_key": plaintext_key,  # Only shown once!
         "key_id": new_key.id,
         "name": new_key.name,
         "description": new_key.description,
-        "created_at": new_key.created_at.isoformat(),
-        "expires_at": new_key.expires_at.isoformat() if new_key.expires_at else None,
+        "created_at": new_key.created_at,
+        "expires_at": new_key.expires_at,
         "last_used_at": None
     }
 
@@ -409,7 +534,7 @@ def create_wallet(
     """
     
     # Check if user already has an active wallet
-    existing_wallet = db.query(Wallet).filter(
+    existing_wallet = db.query(Wallet.id).filter(
         Wallet.user_id == current_user.id,
         Wallet.is_active == True
     ).first()
@@ -428,8 +553,8 @@ def create_wallet(
         new_wallet = Wallet(
             user_id=current_user.id,
             wallet_id=wallet_info["wallet_id"],
-            kyber_public_key=wallet_info["kyber_public_key"],
-            dilithium_public_key=wallet_info["dilithium_public_key"],
+            kyber_public_key=base64.b64decode(wallet_info["kyber_public_key"]),
+            dilithium_public_key=base64.b64decode(wallet_info["dilithium_public_key"]),
             encrypted_kyber_private=wallet_info["encrypted_keys"]["kyber_private"],
             encrypted_dilithium_private=wallet_info["encrypted_keys"]["dilithium_private"],
             encrypted_recovery_seed=wallet_info["encrypted_keys"]["recovery_seed"],
@@ -446,10 +571,10 @@ def create_wallet(
         return {
             "message": "Wallet created successfully. SAVE YOUR RECOVERY PHRASE!",
             "wallet_id": new_wallet.wallet_id,
-            "kyber_public_key": new_wallet.kyber_public_key,
-            "dilithium_public_key": new_wallet.dilithium_public_key,
+            "kyber_public_key": wallet_info["kyber_public_key"],
+            "dilithium_public_key": wallet_info["dilithium_public_key"],
             "recovery_phrase": wallet_info["recovery_phrase"],  # Only shown once!
-            "created_at": new_wallet.created_at.isoformat(),
+            "created_at": new_wallet.created_at,
             "algorithm": new_wallet.algorithm
         }
         
@@ -462,6 +587,8 @@ def create_wallet(
 
 @app.get("/api/wallet/info", response_model=WalletInfo)
 def get_wallet_info(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -469,11 +596,9 @@ def get_wallet_info(
     Get wallet information (public data only)
     - Does not require password
     - Shows public keys and metadata
+    - Supports If-None-Match (only last_unlocked_at changes over time)
     """
-    wallet = db.query(Wallet).filter(
-        Wallet.user_id == current_user.id,
-        Wallet.is_active == True
-    ).first()
+    wallet = db.execute(ACTIVE_WALLET_INFO_BY_USER, {"user_id": current_user.id}).first()
     
     if not wallet:
         raise HTTPException(
@@ -481,12 +606,17 @@ def get_wallet_info(
             detail="No active wallet found. Create one with /api/wallet/create"
         )
     
+    etag = make_etag(wallet.wallet_id, wallet.last_unlocked_at, wallet.is_active)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    
     return {
         "wallet_id": wallet.wallet_id,
-        "kyber_public_key": wallet.kyber_public_key,
-        "dilithium_public_key": wallet.dilithium_public_key,
-        "created_at": wallet.created_at.isoformat(),
-        "last_unlocked_at": wallet.last_unlocked_at.isoformat() if wallet.last_unlocked_at else None,
+        "kyber_public_key": base64.b64encode(wallet.kyber_public_key).decode('utf-8'),
+        "dilithium_public_key": base64.b64encode(wallet.dilithium_public_key).decode('utf-8'),
+        "created_at": wallet.created_at,
+        "last_unlocked_at": wallet.last_unlocked_at,
         "algorithm": wallet.algorithm,
         "is_active": wallet.is_active
     }
@@ -503,10 +633,9 @@ def sign_message(
     - Requires wallet password to unlock
     - Creates quantum-proof digital signature
     """
-    wallet = db.query(Wallet).filter(
-        Wallet.wallet_id == request.wallet_id,
-        Wallet.user_id == current_user.id,
-        Wallet.is_active == True
+    wallet = db.scalars(
+        OWNED_ACTIVE_WALLET,
+        {"wallet_id": request.wallet_id, "user_id": current_user.id}
     ).first()
     
     if not wallet:
@@ -516,21 +645,8 @@ def sign_message(
         )
     
     try:
-        # Reconstruct wallet data
-        wallet_data = {
-            "wallet_id": wallet.wallet_id,
-            "kyber_public_key": wallet.kyber_public_key,
-            "dilithium_public_key": wallet.dilithium_public_key,
-            "salt": wallet.salt,
-            "encrypted_keys": {
-                "kyber_private": wallet.encrypted_kyber_private,
-                "dilithium_private": wallet.encrypted_dilithium_private,
-                "recovery_seed": wallet.encrypted_recovery_seed
-            }
-        }
-        
         # Unlock wallet
-        decrypted_keys = pqc_wallet_service.unlock_wallet(wallet_data, request.password)
+        decrypted_keys = pqc_wallet_service.unlock_wallet(unlock_data(wallet), request.password)
         
         # Sign the message
         signature = pqc_wallet_service.sign_message(
@@ -538,17 +654,19 @@ def sign_message(
             decrypted_keys["dilithium_private_key"]
         )
         
-        # Update last unlocked timestamp
-        wallet.last_unlocked_at = datetime.utcnow()
-        db.commit()
-        
-        return {
+        # Build the response before commit expires the loaded wallet
+        response = {
             "message": "Message signed successfully",
             "signature": signature,
             "wallet_id": wallet.wallet_id,
             "algorithm": wallet.algorithm
         }
         
+        # Update last unlocked timestamp
+        touch_wallet(db, wallet.id)
+        
+        return response
+        
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -561,6 +679,62 @@ def sign_message(
         )
 
 
+@app.post("/api/wallet/session/sign", response_model=BatchSignResponse)
+def sign_messages(
+    request: BatchSignRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Sign several messages with one wallet unlock
+    - Requires wallet password to unlock (once for the whole batch)
+    - Returns signatures in the same order as the messages
+    """
+    wallet = db.scalars(
+        OWNED_ACTIVE_WALLET,
+        {"wallet_id": request.wallet_id, "user_id": current_user.id}
+    ).first()
+    
+    if not wallet:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Wallet not found"
+        )
+    
+    try:
+        # Unlock wallet
+        decrypted_keys = pqc_wallet_service.unlock_wallet(unlock_data(wallet), request.password)
+        
+        # Sign every message with the same loaded key
+        signatures = pqc_wallet_service.sign_messages(
+            [message.encode('utf-8') for message in request.messages],
+            decrypted_keys["dilithium_private_key"]
+        )
+        
+        response = {
+            "message": f"{len(signatures)} messages signed successfully",
+            "signatures": signatures,
+            "wallet_id": wallet.wallet_id,
+            "algorithm": wallet.algorithm
+        }
+        
+        # Update last unlocked timestamp
+        touch_wallet(db, wallet.id)
+        
+        return response
+        
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to sign messages: {str(e)}"
+        )
+
+
 @app.post("/api/wallet/verify")
 def verify_signature(
     request: VerifySignatureRequest,
@@ -570,11 +744,9 @@ def verify_signature(
     Verify a Dilithium signature
     - Does not require authentication (public operation)
     - Verifies quantum-proof signatures
+    - Repeats against the same active key are answered from memory
     """
-    wallet = db.query(Wallet).filter(
-        Wallet.wallet_id == request.wallet_id,
-        Wallet.is_active == True
-    ).first()
+    wallet = db.execute(ACTIVE_WALLET_VERIFY_KEY, {"wallet_id": request.wallet_id}).first()
     
     if not wallet:
         raise HTTPException(
@@ -582,21 +754,30 @@ def verify_signature(
             detail="Wallet not found"
         )
     
+    cache_key = hashlib.blake2b(
+        orjson.dumps([request.message, request.signature]) + wallet.dilithium_public_key,
+        digest_size=16
+    ).digest()
+    with _VERIFY_RESULTS_LOCK:
+        cached = _VERIFY_RESULTS.get(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
-        import base64
-        dilithium_public_key = base64.b64decode(wallet.dilithium_public_key)
-        
         is_valid = pqc_wallet_service.verify_signature(
             request.message.encode('utf-8'),
             request.signature,
-            dilithium_public_key
+            wallet.dilithium_public_key
         )
         
-        return {
+        result = {
             "valid": is_valid,
             "wallet_id": wallet.wallet_id,
             "message": "Signature is valid" if is_valid else "Signature is invalid"
         }
+        with _VERIFY_RESULTS_LOCK:
+            _VERIFY_RESULTS[cache_key] = result
+        return result
         
     except Exception as e:
         raise HTTPException(
@@ -616,39 +797,32 @@ def encrypt_message_for_recipient(
     - Requires your wallet password to sign
     - Uses post-quantum key encapsulation
     """
-    # Get recipient's wallet
-    recipient_wallet = db.query(Wallet).filter(
-        Wallet.wallet_id == request.recipient_wallet_id,
+    # Get recipient's and sender's wallets in one round trip
+    wallets = db.query(Wallet).filter(
+        Wallet.wallet_id.in_((request.recipient_wallet_id, request.sender_wallet_id)),
         Wallet.is_active == True
-    ).first()
+    ).all()
+    by_id = {w.wallet_id: w for w in wallets}
     
+    recipient_wallet = by_id.get(request.recipient_wallet_id)
     if not recipient_wallet:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Recipient wallet not found"
         )
     
-    # Get sender's wallet
-    sender_wallet = db.query(Wallet).filter(
-        Wallet.wallet_id == request.sender_wallet_id,
-        Wallet.user_id == current_user.id,
-        Wallet.is_active == True
-    ).first()
-    
-    if not sender_wallet:
+    sender_wallet = by_id.get(request.sender_wallet_id)
+    if not sender_wallet or sender_wallet.user_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Your wallet not found"
         )
     
     try:
-        import base64
-        recipient_kyber_public = base64.b64decode(recipient_wallet.kyber_public_key)
-        
         # Encrypt message for recipient
         encrypted_package = pqc_wallet_service.encrypt_for_recipient(
             request.message.encode('utf-8'),
-            recipient_kyber_public
+            recipient_wallet.kyber_public_key
         )
         
         return {
@@ -676,10 +850,9 @@ def decrypt_message(
     - Requires wallet password
     - Uses Kyber decapsulation
     """
-    wallet = db.query(Wallet).filter(
-        Wallet.wallet_id == request.wallet_id,
-        Wallet.user_id == current_user.id,
-        Wallet.is_active == True
+    wallet = db.scalars(
+        OWNED_ACTIVE_WALLET,
+        {"wallet_id": request.wallet_id, "user_id": current_user.id}
     ).first()
     
     if not wallet:
@@ -689,21 +862,8 @@ def decrypt_message(
         )
     
     try:
-        # Reconstruct wallet data
-        wallet_data = {
-            "wallet_id": wallet.wallet_id,
-            "kyber_public_key": wallet.kyber_public_key,
-            "dilithium_public_key": wallet.dilithium_public_key,
-            "salt": wallet.salt,
-            "encrypted_keys": {
-                "kyber_private": wallet.encrypted_kyber_private,
-                "dilithium_private": wallet.encrypted_dilithium_private,
-                "recovery_seed": wallet.encrypted_recovery_seed
-            }
-        }
-        
         # Unlock wallet
-        decrypted_keys = pqc_wallet_service.unlock_wallet(wallet_data, request.password)
+        decrypted_keys = pqc_wallet_service.unlock_wallet(unlock_data(wallet), request.password)
         
         # Decrypt message
         decrypted_message = pqc_wallet_service.decrypt_from_sender(
@@ -711,16 +871,17 @@ def decrypt_message(
             decrypted_keys["kyber_private_key"]
         )
         
-        # Update last unlocked timestamp
-        wallet.last_unlocked_at = datetime.utcnow()
-        db.commit()
-        
-        return {
+        response = {
             "message": "Message decrypted successfully",
             "decrypted_message": decrypted_message.decode('utf-8'),
             "wallet_id": wallet.wallet_id
         }
         
+        # Update last unlocked timestamp
+        touch_wallet(db, wallet.id)
+        
+        return response
+        
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -733,20 +894,79 @@ def decrypt_message(
         )
 
 
+@app.post("/api/wallet/session/decrypt", response_model=BatchDecryptResponse)
+def decrypt_messages(
+    request: BatchDecryptRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Decrypt several messages with one wallet unlock
+    - Requires wallet password (once for the whole batch)
+    - Returns plaintexts in the same order as the packages
+    """
+    wallet = db.scalars(
+        OWNED_ACTIVE_WALLET,
+        {"wallet_id": request.wallet_id, "user_id": current_user.id}
+    ).first()
+    
+    if not wallet:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Wallet not found"
+        )
+    
+    try:
+        # Unlock wallet
+        decrypted_keys = pqc_wallet_service.unlock_wallet(unlock_data(wallet), request.password)
+        private_key = decrypted_keys["kyber_private_key"]
+        
+        # Decrypt every package with the same key
+        decrypted_messages = [
+            pqc_wallet_service.decrypt_from_sender(package, private_key).decode('utf-8')
+            for package in request.encrypted_packages
+        ]
+        
+        response = {
+            "message": f"{len(decrypted_messages)} messages decrypted successfully",
+            "decrypted_messages": decrypted_messages,
+            "wallet_id": wallet.wallet_id
+        }
+        
+        # Update last unlocked timestamp
+        touch_wallet(db, wallet.id)
+        
+        return response
+        
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to decrypt messages: {str(e)}"
+        )
+
+
 # ============================================================================
 # RUN SERVER
 # ============================================================================
 
 if __name__ == "__main__":
-    import os
-    
     # Get port from environment variable (Railway sets this)
     port = int(os.environ.get("PORT", 8000))
     
-    # Run server
+    # Create/upgrade tables once, before any worker process imports the app
+    migrate()
+    
+    # Run server (uvicorn[standard] picks uvloop + httptools automatically)
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=port,
+        workers=int(os.environ.get("WEB_CONCURRENCY", "1")),
+        timeout_keep_alive=30,
         # Railway handles TLS/HTTPS automatically
     )
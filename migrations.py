@@ -0,0 +1,173 @@
+"""
+Database Migrations
+Bring databases created by older versions up to the current models
+(create_all() only creates missing tables, it never alters existing ones)
+Run once before the server starts, not per worker: python migrations.py
+"""
+import base64
+from sqlalchemy import LargeBinary, MetaData, inspect, text
+from sqlalchemy.schema import CreateTable
+from database import engine, Base, IS_SQLITE, SessionLocal
+from api_key_service import APIKeyService
+import models  # noqa: F401 - registers the tables on Base.metadata
+
+
+def _quote(name: str) -> str:
+    return engine.dialect.identifier_preparer.quote(name)
+
+
+def _rebuild_sqlite_table(conn, table):
+    """
+    Recreate a table from its model, keeping its rows
+    SQLite cannot ALTER a column's constraints, so this is the only way to
+    relax NOT NULL there. Follows SQLite's documented order (create new,
+    copy, drop old, rename new) so foreign keys in other tables still
+    reference the table afterwards; upgrade_schema turns foreign keys off
+    around it
+    """
+    new_name = f"_{table.name}_new"
+    existing = {c["name"] for c in inspect(conn).get_columns(table.name)}
+    # Copy of the model under the temporary name (with the tables it references)
+    scratch = MetaData()
+    for model_table in Base.metadata.tables.values():
+        model_table.to_metadata(scratch)
+    new_table = table.to_metadata(scratch, name=new_name)
+    # CREATE TABLE only: index names are global, so indexes come after the rename
+    conn.execute(CreateTable(new_table))
+    columns = ", ".join(_quote(c.name) for c in table.columns if c.name in existing)
+    conn.execute(text(
+        f"INSERT INTO {_quote(new_name)} ({columns}) SELECT {columns} FROM {_quote(table.name)}"
+    ))
+    conn.execute(text(f"DROP TABLE {_quote(table.name)}"))
+    conn.execute(text(f"ALTER TABLE {_quote(new_name)} RENAME TO {_quote(table.name)}"))
+    for index in table.indexes:
+        index.create(conn)
+
+
+def upgrade_schema():
+    """
+    Add missing columns and indexes to existing tables and drop NOT NULL
+    where the model now allows NULL (e.g. api_keys.key once keys are hashed)
+    Added columns are nullable since existing rows have no value for them
+    Safe to run on every startup
+    """
+    with engine.connect() as conn:
+        if IS_SQLITE:
+            # Table rebuilds need foreign keys off; the pragma is ignored
+            # inside a transaction, so set it first and restore it after
+            foreign_keys = conn.exec_driver_sql("PRAGMA foreign_keys").scalar()
+            conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            conn.commit()
+        try:
+            with conn.begin():
+                if IS_SQLITE:
+                    # pysqlite doesn't open a transaction before DDL on its own
+                    conn.exec_driver_sql("BEGIN")
+                _upgrade_tables(conn)
+                if IS_SQLITE:
+                    violations = conn.exec_driver_sql("PRAGMA foreign_key_check").all()
+                    if violations:
+                        raise RuntimeError(f"Schema upgrade broke foreign keys: {violations}")
+        finally:
+            if IS_SQLITE and foreign_keys:
+                conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+                conn.commit()
+
+
+def _upgrade_tables(conn):
+    """Bring each existing table up to its model (see upgrade_schema)"""
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {c["name"]: c for c in inspector.get_columns(table.name)}
+        
+        relax = [
+            c.name for c in table.columns
+            if c.name in existing and c.nullable and not existing[c.name]["nullable"]
+        ]
+        if relax and IS_SQLITE:
+            # The rebuilt table already has every column and index
+            _rebuild_sqlite_table(conn, table)
+            continue
+        for name in relax:
+            conn.execute(text(f"ALTER TABLE {_quote(table.name)} ALTER COLUMN {_quote(name)} DROP NOT NULL"))
+        
+        for column in table.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(
+                    f"ALTER TABLE {_quote(table.name)} ADD COLUMN {_quote(column.name)} {column_type}"
+                ))
+        
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(conn)
+
+
+def migrate_wallet_public_keys() -> int:
+    """
+    Decode wallet public keys still stored as base64 text (before they were
+    stored as raw bytes)
+    Safe to run on every startup
+    """
+    columns = ("kyber_public_key", "dilithium_public_key")
+    with engine.begin() as conn:
+        if not IS_SQLITE:
+            # Postgres: convert the column type, decoding every row in place
+            types = {c["name"]: c["type"] for c in inspect(conn).get_columns("wallets")}
+            pending = [name for name in columns if not isinstance(types[name], LargeBinary)]
+            for name in pending:
+                conn.execute(text(
+                    f"ALTER TABLE wallets ALTER COLUMN {_quote(name)} TYPE bytea "
+                    f"USING decode({_quote(name)}, 'base64')"
+                ))
+            return len(pending)
+        
+        # SQLite keeps whatever type each value was written with
+        rows = conn.execute(text(
+            "SELECT id, kyber_public_key, dilithium_public_key FROM wallets "
+            "WHERE typeof(kyber_public_key) = 'text' OR typeof(dilithium_public_key) = 'text'"
+        )).all()
+        for wallet_id, kyber_public_key, dilithium_public_key in rows:
+            conn.execute(
+                text(
+                    "UPDATE wallets SET kyber_public_key = :kyber, dilithium_public_key = :dilithium "
+                    "WHERE id = :id"
+                ),
+                {
+                    "id": wallet_id,
+                    "kyber": _decode_public_key(kyber_public_key),
+                    "dilithium": _decode_public_key(dilithium_public_key)
+                }
+            )
+        return len(rows)
+
+
+def _decode_public_key(value):
+    """Raw key bytes from a stored value (base64 text or already raw)"""
+    return base64.b64decode(value) if isinstance(value, str) else value
+
+
+def migrate():
+    """
+    Create missing tables and run every migration
+    Not safe to run from several processes at once (DDL and table rebuilds
+    would race), so it runs once before the server starts its workers
+    """
+    Base.metadata.create_all(bind=engine)
+    
+    # Add columns/indexes that tables from older versions are missing
+    upgrade_schema()
+    
+    # Hash any API keys still stored in plaintext
+    with SessionLocal() as db:
+        APIKeyService(db).migrate_plaintext_keys()
+    
+    # Decode wallet public keys still stored as base64 text
+    migrate_wallet_public_keys()
+
+
+if __name__ == "__main__":
+    migrate()
@@ -2,11 +2,11 @@
 Database Models
 Simple and clean data structures
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from database import Base
 
 
@@ -33,7 +33,9 @@ class APIKey(Base):
     __tablename__ = "api_keys"
     
     id = Column(Integer, primary_key=True, index=True)
-    key = Column(String, unique=True, index=True, nullable=False)
+    key = Column(String, unique=True, index=True, nullable=True)  # Legacy plaintext keys only
+    key_hash = Column(LargeBinary(32), unique=True, index=True, nullable=True)  # SHA-256 of the key
+    key_preview = Column(String, nullable=True)  # Masked key for display
     name = Column(String, nullable=False)
     description = Column(Text, nullable=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -46,6 +48,12 @@ class APIKey(Base):
     
     # Relationship with user
     owner = relationship("User", back_populates="api_keys")
+    
+    # Indexes for the list (user + active) and cleanup (expiry + active) queries
+    __table_args__ = (
+        Index("ix_api_keys_user_active", "user_id", "is_active"),
+        Index("ix_api_keys_expires_active", "expires_at", "is_active"),
+    )
 
 
 class Wallet(Base):
@@ -57,8 +65,9 @@ class Wallet(Base):
     wallet_id = Column(String, unique=True, index=True, nullable=False)  # Public wallet identifier
     
     # Public keys (can be shared)
-    kyber_public_key = Column(Text, nullable=False)  # For encryption (KEM)
-    dilithium_public_key = Column(Text, nullable=False)  # For signatures
+    # Raw key bytes; base64-encoded only when returned by the API
+    kyber_public_key = Column(LargeBinary, nullable=False)  # For encryption (KEM)
+    dilithium_public_key = Column(LargeBinary, nullable=False)  # For signatures
     
     # Encrypted private keys (never shared)
     encrypted_kyber_private = Column(Text, nullable=False)
@@ -67,8 +76,8 @@ class Wallet(Base):
     salt = Column(String, nullable=False)  # Salt used for key derivation
     
     # Metadata
-    version = Column(String, default="1.0")
-    algorithm = Column(String, default="RSA-2048 (PQC-Ready)")
+    version = Column(String, default="2.2")
+    algorithm = Column(String, default="X25519/Ed25519 (PQC-Ready)")
     created_at = Column(DateTime, default=datetime.utcnow)
     last_unlocked_at = Column(DateTime, nullable=True)
     
@@ -76,6 +85,17 @@ class Wallet(Base):
     
     # Relationship with user
     owner = relationship("User", backref="wallets")
+    
+    __table_args__ = (
+        # Covering on Postgres: /api/wallet/info is answered from the index
+        Index(
+            "ix_wallets_user_active", "user_id", "is_active",
+            postgresql_include=[
+                "id", "wallet_id", "kyber_public_key", "dilithium_public_key",
+                "created_at", "last_unlocked_at", "algorithm"
+            ]
+        ),
+    )
 
 
 # ============================================================================
@@ -109,9 +129,9 @@ class APIKeyResponse(BaseModel):
     key_id: int
     name: str
     description: Optional[str]
-    created_at: str
-    expires_at: Optional[str]
-    last_used_at: Optional[str]
+    created_at: datetime
+    expires_at: Optional[datetime]
+    last_used_at: Optional[datetime]
     
     class Config:
         from_attributes = True
@@ -139,7 +159,7 @@ class WalletResponse(BaseModel):
     kyber_public_key: str
     dilithium_public_key: str
     recovery_phrase: str  # Only shown once during creation
-    created_at: str
+    created_at: datetime
     algorithm: str
     
     class Config:
@@ -151,8 +171,8 @@ class WalletInfo(BaseModel):
     wallet_id: str
     kyber_public_key: str
     dilithium_public_key: str
-    created_at: str
-    last_unlocked_at: Optional[str]
+    created_at: datetime
+    last_unlocked_at: Optional[datetime]
     algorithm: str
     is_active: bool
     
@@ -175,6 +195,21 @@ class SignMessageResponse(BaseModel):
     algorithm: str
 
 
+class BatchSignRequest(BaseModel):
+    """Request model for signing several messages with one unlock"""
+    wallet_id: str
+    password: str
+    messages: List[str] = Field(..., min_length=1, max_length=256)
+
+
+class BatchSignResponse(BaseModel):
+    """Response model for batch signatures (same order as the messages)"""
+    message: str
+    signatures: List[str]
+    wallet_id: str
+    algorithm: str
+
+
 class VerifySignatureRequest(BaseModel):
     """Request model for verifying a signature"""
     wallet_id: str
@@ -195,3 +230,17 @@ class DecryptMessageRequest(BaseModel):
     wallet_id: str
     password: str
     encrypted_package: dict
+
+
+class BatchDecryptRequest(BaseModel):
+    """Request model for decrypting several messages with one unlock"""
+    wallet_id: str
+    password: str
+    encrypted_packages: List[dict] = Field(..., min_length=1, max_length=256)
+
+
+class BatchDecryptResponse(BaseModel):
+    """Response model for batch decryption (same order as the packages)"""
+    message: str
+    decrypted_messages: List[str]
+    wallet_id: str
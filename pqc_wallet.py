@@ -4,23 +4,70 @@ Implements post-quantum cryptography using CRYSTALS-Kyber and Dilithium
 """
 import base64
 import json
+import os
 import secrets
 from datetime import datetime
-from typing import Optional, Tuple, Dict
+from threading import Lock
+from typing import Optional, Tuple, Dict, List, Union
+from cachetools import TTLCache
+from mnemonic import Mnemonic
+from cryptography.exceptions import InvalidSignature
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
 import hashlib
 
 # Import cryptography for key generation
-from cryptography.hazmat.primitives.asymmetric import rsa, padding
+from cryptography.hazmat.primitives.asymmetric import ed25519, padding, x25519
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives import serialization
 
 # Note: True PQC algorithms (Kyber, Dilithium) require additional libraries
-# For this demo, we'll use RSA but design the API to be PQC-ready
+# For this demo, we'll use X25519/Ed25519 but design the API to be PQC-ready
 PQC_AVAILABLE = True
-print("Info: Using RSA-based implementation (PQC-ready design)")
+print("Info: Using X25519/Ed25519 implementation (PQC-ready design)")
+
+ALGORITHM = "X25519/Ed25519 (PQC-Ready)"
+
+# Raw key / signature sizes for the current algorithms
+CURVE_KEY_LEN = 32
+ED25519_SIGNATURE_LEN = 64
+
+# Wallets created before 2.0 hold RSA-2048 PEM keys; their signatures and
+# OAEP ciphertexts are always exactly 256 bytes
+RSA_OUTPUT_LEN = 2048 // 8
+_PSS = padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.MAX_LENGTH)
+_OAEP = padding.OAEP(mgf=padding.MGF1(algorithm=hashes.SHA256()), algorithm=hashes.SHA256(), label=None)
+
+
+def _is_legacy_rsa(key: bytes) -> bool:
+    """True for RSA PEM keys from 1.0 wallets"""
+    return key.startswith(b"-----BEGIN")
+
+
+# Wallets stored as format 1.0 (or with no version) use PBKDF2 + Fernet for
+# their private keys; every later wallet uses scrypt + AES-256-GCM
+LEGACY_VERSION = "1.0"
+SCRYPT_N = 2 ** 14  # 16 MiB per derivation with r=8
+
+# Packages tagged with this cipher use AES-256-GCM (nonce || ciphertext ||
+# tag); untagged (1.0) packages are Fernet
+PACKAGE_CIPHER = "AES-256-GCM"
+NONCE_LEN = 12
+
+
+# Private keys of recently unlocked wallets, keyed by a hash of wallet id,
+# salt and password, so repeat unlocks skip the KDF (0 disables)
+WALLET_UNLOCK_CACHE_TTL = int(os.environ.get("WALLET_UNLOCK_CACHE_TTL", "300"))
+_UNLOCK_CACHE = TTLCache(maxsize=1024, ttl=WALLET_UNLOCK_CACHE_TTL) if WALLET_UNLOCK_CACHE_TTL > 0 else None
+_UNLOCK_CACHE_LOCK = Lock()
+
+# Recovery phrases are BIP39: 24 words encode the full 32-byte wallet seed
+SEED_LEN = 32
+SALT_LEN = 16
+_BIP39 = Mnemonic("english")
 
 
 class PQCWallet:
@@ -30,7 +77,7 @@ class PQCWallet:
     """
     
     def __init__(self):
-        self.version = "1.0"
+        self.version = "2.2"
         
     def generate_wallet(self, user_password: str) -> Dict:
         """
@@ -45,39 +92,21 @@ class PQCWallet:
         if not PQC_AVAILABLE:
             raise Exception("Crypto library not available")
         
-        # Generate RSA keypair for encryption (simulating Kyber KEM)
-        kyber_private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
-        kyber_public_key = kyber_private.public_key().public_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PublicFormat.SubjectPublicKeyInfo
-        )
-        kyber_private_key = kyber_private.private_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PrivateFormat.PKCS8,
-            encryption_algorithm=serialization.NoEncryption()
-        )
-        
-        # Generate RSA keypair for signatures (simulating Dilithium)
-        dilithium_private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
-        dilithium_public_key = dilithium_private.public_key().public_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PublicFormat.SubjectPublicKeyInfo
-        )
-        dilithium_private_key = dilithium_private.private_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PrivateFormat.PKCS8,
-            encryption_algorithm=serialization.NoEncryption()
-        )
-        
-        # Generate recovery seed (24 words worth of entropy)
-        recovery_seed = secrets.token_bytes(32)
+        # Generate the wallet seed; the recovery phrase encodes all of it so
+        # recover_wallet can rebuild the same keys
+        recovery_seed = secrets.token_bytes(SEED_LEN)
         recovery_phrase = self._generate_recovery_phrase(recovery_seed)
         
-        # Encrypt private keys with user password
-        encryption_key = self._derive_key_from_password(user_password, recovery_seed[:16])
-        encrypted_kyber_private = self._encrypt_data(kyber_private_key, encryption_key)
-        encrypted_dilithium_private = self._encrypt_data(dilithium_private_key, encryption_key)
-        encrypted_recovery_seed = self._encrypt_data(recovery_seed, encryption_key)
+        # Derive keypairs (X25519 simulating Kyber, Ed25519 simulating Dilithium)
+        kyber_public_key, kyber_private_key, dilithium_public_key, dilithium_private_key = \
+            self._generate_keypairs(recovery_seed)
+        
+        # Encrypt private keys with user password (independent random salt)
+        salt = secrets.token_bytes(SALT_LEN)
+        cipher = self._cipher(self._derive_key_from_password(user_password, salt))
+        encrypted_kyber_private = self._encrypt_data(kyber_private_key, cipher)
+        encrypted_dilithium_private = self._encrypt_data(dilithium_private_key, cipher)
+        encrypted_recovery_seed = self._encrypt_data(recovery_seed, cipher)
         
         # Create wallet structure
         wallet = {
@@ -91,11 +120,15 @@ class PQCWallet:
                 "dilithium_private": encrypted_dilithium_private,
                 "recovery_seed": encrypted_recovery_seed
             },
-            "salt": base64.b64encode(recovery_seed[:16]).decode('utf-8'),  # Store salt for decryption
+            "salt": base64.b64encode(salt).decode('utf-8'),  # Store salt for decryption
             "recovery_phrase": recovery_phrase,  # Should be shown once and stored securely by user
-            "algorithm": "RSA-2048 (PQC-Ready)"
+            "algorithm": ALGORITHM
         }
         
+        # The keys are already in hand: prime the unlock cache so the first
+        # unlock after creation skips the KDF and decryption
+        self._cache_unlocked(wallet, user_password, kyber_private_key, dilithium_private_key)
+        
         return wallet
     
     def recover_wallet(self, recovery_phrase: str, user_password: str) -> Optional[Dict]:
@@ -103,44 +136,28 @@ class PQCWallet:
         Recover wallet from recovery phrase
         
         Args:
-            recovery_phrase: The recovery phrase (12 words)
+            recovery_phrase: The recovery phrase (24 words)
             user_password: New password for the wallet
             
         Returns:
             Recovered wallet data
+            
+        Raises:
+            ValueError: If the phrase is not a valid 24-word recovery phrase
         """
         # Convert recovery phrase back to seed
         recovery_seed = self._recovery_phrase_to_seed(recovery_phrase)
         
         # Regenerate keys deterministically from seed
-        # Note: This is a simplified version. In production, use proper seed derivation
-        kyber_private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
-        kyber_public_key = kyber_private.public_key().public_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PublicFormat.SubjectPublicKeyInfo
-        )
-        kyber_private_key = kyber_private.private_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PrivateFormat.PKCS8,
-            encryption_algorithm=serialization.NoEncryption()
-        )
+        kyber_public_key, kyber_private_key, dilithium_public_key, dilithium_private_key = \
+            self._generate_keypairs(recovery_seed)
         
-        dilithium_private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
-        dilithium_public_key = dilithium_private.public_key().public_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PublicFormat.SubjectPublicKeyInfo
-        )
-        dilithium_private_key = dilithium_private.private_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PrivateFormat.PKCS8,
-            encryption_algorithm=serialization.NoEncryption()
-        )
-        
-        # Re-encrypt with new password
-        encryption_key = self._derive_key_from_password(user_password, recovery_seed[:16])
-        encrypted_kyber_private = self._encrypt_data(kyber_private_key, encryption_key)
-        encrypted_dilithium_private = self._encrypt_data(dilithium_private_key, encryption_key)
-        encrypted_recovery_seed = self._encrypt_data(recovery_seed, encryption_key)
+        # Re-encrypt with new password (fresh salt)
+        salt = secrets.token_bytes(SALT_LEN)
+        cipher = self._cipher(self._derive_key_from_password(user_password, salt))
+        encrypted_kyber_private = self._encrypt_data(kyber_private_key, cipher)
+        encrypted_dilithium_private = self._encrypt_data(dilithium_private_key, cipher)
+        encrypted_recovery_seed = self._encrypt_data(recovery_seed, cipher)
         
         wallet = {
             "version": self.version,
@@ -154,9 +171,14 @@ class PQCWallet:
                 "dilithium_private": encrypted_dilithium_private,
                 "recovery_seed": encrypted_recovery_seed
             },
-            "algorithm": "RSA-2048 (PQC-Ready)"
+            "salt": base64.b64encode(salt).decode('utf-8'),
+            "algorithm": ALGORITHM
         }
         
+        # The keys are already in hand: prime the unlock cache so the first
+        # unlock after creation skips the KDF and decryption
+        self._cache_unlocked(wallet, user_password, kyber_private_key, dilithium_private_key)
+        
         return wallet
     
     def unlock_wallet(self, wallet_data: Dict, user_password: str) -> Dict:
@@ -164,171 +186,208 @@ class PQCWallet:
         Unlock wallet and decrypt private keys
         
         Args:
-            wallet_data: Encrypted wallet data (must include 'salt')
+            wallet_data: Encrypted wallet data (must include 'salt'; 'version'
+                1.0 or missing selects legacy PBKDF2 + Fernet; the base64
+                public keys are optional and decoded if present)
             user_password: User's password
             
         Returns:
             Decrypted private keys
         """
-        # Get the salt from wallet data
-        salt = base64.b64decode(wallet_data["salt"])
+        cache_key = None
+        cached = None
+        if _UNLOCK_CACHE is not None:
+            cache_key = self._unlock_cache_key(wallet_data, user_password)
+            with _UNLOCK_CACHE_LOCK:
+                cached = _UNLOCK_CACHE.get(cache_key)
         
         try:
-            # Derive encryption key using stored salt
-            encryption_key = self._derive_key_from_password(user_password, salt)
-            
-            # Decrypt the private keys
-            kyber_private = self._decrypt_data(
-                wallet_data["encrypted_keys"]["kyber_private"],
-                encryption_key
-            )
-            dilithium_private = self._decrypt_data(
-                wallet_data["encrypted_keys"]["dilithium_private"],
-                encryption_key
-            )
+            if cached is not None:
+                kyber_private, dilithium_private = cached
+            else:
+                # Derive encryption key using stored salt
+                salt = base64.b64decode(wallet_data["salt"])
+                # Stored wallets without a version predate versioning (1.0)
+                legacy = (wallet_data.get("version") or LEGACY_VERSION) == LEGACY_VERSION
+                cipher = self._cipher(
+                    self._derive_key_from_password(user_password, salt, legacy),
+                    legacy=legacy
+                )
+                
+                # Decrypt the private keys
+                kyber_private = self._decrypt_data(
+                    wallet_data["encrypted_keys"]["kyber_private"],
+                    cipher
+                )
+                dilithium_private = self._decrypt_data(
+                    wallet_data["encrypted_keys"]["dilithium_private"],
+                    cipher
+                )
+                if cache_key is not None:
+                    with _UNLOCK_CACHE_LOCK:
+                        _UNLOCK_CACHE[cache_key] = (kyber_private, dilithium_private)
             
-            return {
+            keys = {
                 "kyber_private_key": kyber_private,
-                "dilithium_private_key": dilithium_private,
-                "kyber_public_key": base64.b64decode(wallet_data["kyber_public_key"]),
-                "dilithium_public_key": base64.b64decode(wallet_data["dilithium_public_key"])
+                "dilithium_private_key": dilithium_private
             }
+            for name in ("kyber_public_key", "dilithium_public_key"):
+                if name in wallet_data:
+                    keys[name] = base64.b64decode(wallet_data[name])
+            return keys
         except Exception as e:
             raise ValueError("Invalid password or corrupted wallet data")
     
     def sign_message(self, message: bytes, dilithium_private_key: bytes) -> str:
         """
-        Sign a message using RSA (simulating Dilithium quantum-proof signature)
+        Sign a message using Ed25519 (simulating Dilithium quantum-proof signature)
         
         Args:
             message: Message to sign
-            dilithium_private_key: Private signing key (PEM format)
+            dilithium_private_key: Private signing key (raw, or PEM for 1.0 wallets)
             
         Returns:
             Base64 encoded signature
         """
-        from cryptography.hazmat.primitives.asymmetric import padding as asym_padding
+        return self.sign_messages([message], dilithium_private_key)[0]
+    
+    def sign_messages(self, messages: List[bytes], dilithium_private_key: bytes) -> List[str]:
+        """
+        Sign several messages with one key, loading the key only once
         
-        private_key = serialization.load_pem_private_key(
-            dilithium_private_key,
-            password=None,
-            backend=default_backend()
-        )
-        signature = private_key.sign(
-            message,
-            asym_padding.PSS(
-                mgf=asym_padding.MGF1(hashes.SHA256()),
-                salt_length=asym_padding.PSS.MAX_LENGTH
-            ),
-            hashes.SHA256()
-        )
-        return base64.b64encode(signature).decode('utf-8')
+        Args:
+            messages: Messages to sign
+            dilithium_private_key: Private signing key (raw, or PEM for 1.0 wallets)
+            
+        Returns:
+            Base64 encoded signatures, in message order
+        """
+        if _is_legacy_rsa(dilithium_private_key):
+            private_key = serialization.load_pem_private_key(
+                dilithium_private_key,
+                password=None,
+                # Our own key, decrypted from the wallet: skip the costly
+                # RSA consistency checks on every load
+                unsafe_skip_rsa_key_validation=True
+            )
+            signatures = [private_key.sign(message, _PSS, hashes.SHA256()) for message in messages]
+        else:
+            private_key = ed25519.Ed25519PrivateKey.from_private_bytes(dilithium_private_key)
+            signatures = [private_key.sign(message) for message in messages]
+        return [base64.b64encode(signature).decode('utf-8') for signature in signatures]
     
     def verify_signature(self, message: bytes, signature: str, dilithium_public_key: bytes) -> bool:
         """
-        Verify an RSA signature (simulating Dilithium)
+        Verify an Ed25519 signature (simulating Dilithium)
         
         Args:
             message: Original message
             signature: Base64 encoded signature
-            dilithium_public_key: Public verification key (PEM format)
+            dilithium_public_key: Public verification key (raw, or PEM for 1.0 wallets)
             
         Returns:
             True if signature is valid
         """
         try:
-            from cryptography.hazmat.primitives.asymmetric import padding as asym_padding
-            
             sig_bytes = base64.b64decode(signature)
-            public_key = serialization.load_pem_public_key(
-                dilithium_public_key,
-                backend=default_backend()
-            )
-            public_key.verify(
-                sig_bytes,
-                message,
-                asym_padding.PSS(
-                    mgf=asym_padding.MGF1(hashes.SHA256()),
-                    salt_length=asym_padding.PSS.MAX_LENGTH
-                ),
-                hashes.SHA256()
-            )
+            legacy = _is_legacy_rsa(dilithium_public_key)
+            # Reject wrong-length signatures before parsing the key
+            if len(sig_bytes) != (RSA_OUTPUT_LEN if legacy else ED25519_SIGNATURE_LEN):
+                return False
+            if legacy:
+                public_key = serialization.load_pem_public_key(
+                    dilithium_public_key
+                )
+                public_key.verify(sig_bytes, message, _PSS, hashes.SHA256())
+            else:
+                public_key = ed25519.Ed25519PublicKey.from_public_bytes(dilithium_public_key)
+                public_key.verify(sig_bytes, message)
             return True
-        except:
+        except (InvalidSignature, ValueError):
+            # ValueError also covers malformed base64 (binascii.Error) and keys
             return False
     
     def encrypt_for_recipient(self, data: bytes, recipient_kyber_public_key: bytes) -> Dict:
         """
-        Encrypt data for a recipient using RSA (simulating Kyber KEM)
+        Encrypt data for a recipient using X25519 (simulating Kyber KEM)
         
         Args:
             data: Data to encrypt
-            recipient_kyber_public_key: Recipient's public key (PEM format)
+            recipient_kyber_public_key: Recipient's public key (raw, or PEM for 1.0 wallets)
             
         Returns:
             Dictionary with ciphertext and encapsulated key
         """
-        from cryptography.hazmat.primitives.asymmetric import padding as asym_padding
-        
-        # Generate a random symmetric key
-        symmetric_key = secrets.token_bytes(32)
-        
-        # Encrypt the symmetric key with recipient's public key
-        public_key = serialization.load_pem_public_key(
-            recipient_kyber_public_key,
-            backend=default_backend()
-        )
-        encrypted_key = public_key.encrypt(
-            symmetric_key,
-            asym_padding.OAEP(
-                mgf=asym_padding.MGF1(algorithm=hashes.SHA256()),
-                algorithm=hashes.SHA256(),
-                label=None
+        if _is_legacy_rsa(recipient_kyber_public_key):
+            # Encrypt a random symmetric key with recipient's RSA public key
+            symmetric_key = secrets.token_bytes(32)
+            public_key = serialization.load_pem_public_key(
+                recipient_kyber_public_key
+            )
+            encrypted_key = public_key.encrypt(symmetric_key, _OAEP)
+            encryption_key = self._derive_key_from_secret(symmetric_key)
+        else:
+            # Ephemeral ECDH: the ephemeral public key is the encapsulated key
+            ephemeral = x25519.X25519PrivateKey.generate()
+            encrypted_key = ephemeral.public_key().public_bytes_raw()
+            shared_secret = ephemeral.exchange(
+                x25519.X25519PublicKey.from_public_bytes(recipient_kyber_public_key)
+            )
+            encryption_key = self._derive_key_from_exchange(
+                shared_secret, encrypted_key, recipient_kyber_public_key
             )
-        )
         
         # Use symmetric key to encrypt the actual data
-        encryption_key = self._derive_key_from_secret(symmetric_key)
-        encrypted_data = self._encrypt_data(data, encryption_key)
+        encrypted_data = self._encrypt_data(data, self._cipher(encryption_key))
         
         return {
             "ciphertext": base64.b64encode(encrypted_key).decode('utf-8'),
-            "encrypted_data": encrypted_data
+            "encrypted_data": encrypted_data,
+            "cipher": PACKAGE_CIPHER
         }
     
     def decrypt_from_sender(self, encrypted_package: Dict, kyber_private_key: bytes) -> bytes:
         """
-        Decrypt data sent by another user using RSA (simulating Kyber)
+        Decrypt data sent by another user using X25519 (simulating Kyber)
         
         Args:
             encrypted_package: Package containing ciphertext and encrypted data
-            kyber_private_key: Your private key (PEM format)
+            kyber_private_key: Your private key (raw, or PEM for 1.0 wallets)
             
         Returns:
             Decrypted data
         """
-        from cryptography.hazmat.primitives.asymmetric import padding as asym_padding
-        
         encrypted_key = base64.b64decode(encrypted_package["ciphertext"])
         
-        # Decrypt the symmetric key with private key
-        private_key = serialization.load_pem_private_key(
-            kyber_private_key,
-            password=None,
-            backend=default_backend()
-        )
-        symmetric_key = private_key.decrypt(
-            encrypted_key,
-            asym_padding.OAEP(
-                mgf=asym_padding.MGF1(algorithm=hashes.SHA256()),
-                algorithm=hashes.SHA256(),
-                label=None
+        if _is_legacy_rsa(kyber_private_key):
+            if len(encrypted_key) != RSA_OUTPUT_LEN:
+                raise ValueError("Invalid ciphertext length")
+            # Decrypt the symmetric key with private key
+            private_key = serialization.load_pem_private_key(
+                kyber_private_key,
+                password=None,
+                # Our own key, decrypted from the wallet: skip the costly
+                # RSA consistency checks on every load
+                unsafe_skip_rsa_key_validation=True
+            )
+            symmetric_key = private_key.decrypt(encrypted_key, _OAEP)
+            encryption_key = self._derive_key_from_secret(symmetric_key)
+        else:
+            if len(encrypted_key) != CURVE_KEY_LEN:
+                raise ValueError("Invalid ciphertext length")
+            private_key = x25519.X25519PrivateKey.from_private_bytes(kyber_private_key)
+            shared_secret = private_key.exchange(
+                x25519.X25519PublicKey.from_public_bytes(encrypted_key)
+            )
+            encryption_key = self._derive_key_from_exchange(
+                shared_secret, encrypted_key, private_key.public_key().public_bytes_raw()
             )
-        )
         
-        # Derive encryption key and decrypt data
-        encryption_key = self._derive_key_from_secret(symmetric_key)
-        decrypted_data = self._decrypt_data(encrypted_package["encrypted_data"], encryption_key)
+        # Decrypt data (packages without a cipher tag predate AES-GCM)
+        decrypted_data = self._decrypt_data(
+            encrypted_package["encrypted_data"],
+            self._cipher(encryption_key, legacy=encrypted_package.get("cipher") != PACKAGE_CIPHER)
+        )
         
         return decrypted_data
     
@@ -336,66 +395,109 @@ class PQCWallet:
     # Helper Methods
     # ========================================================================
     
-    def _derive_key_from_password(self, password: str, salt: bytes) -> bytes:
-        """Derive encryption key from password using PBKDF2"""
-        kdf = PBKDF2HMAC(
+    def _derive_key_from_password(self, password: str, salt: bytes, legacy: bool = False) -> bytes:
+        """
+        Derive encryption key from password
+        scrypt (memory-hard), or PBKDF2 for legacy 1.0 wallets
+        """
+        if not legacy:
+            kdf = Scrypt(salt=salt, length=32, n=SCRYPT_N, r=8, p=1)
+        else:
+            kdf = PBKDF2HMAC(
+                algorithm=hashes.SHA256(),
+                length=32,
+                salt=salt,
+                iterations=100000
+            )
+        return kdf.derive(password.encode())
+    
+    def _generate_keypairs(self, seed: bytes) -> Tuple[bytes, bytes, bytes, bytes]:
+        """Raw (kyber public, kyber private, dilithium public, dilithium private) keys derived from seed"""
+        # Any 32 bytes are a valid X25519/Ed25519 private key
+        kyber_private = x25519.X25519PrivateKey.from_private_bytes(self._derive_key_from_seed(seed, b"kyber"))
+        dilithium_private = ed25519.Ed25519PrivateKey.from_private_bytes(self._derive_key_from_seed(seed, b"dilithium"))
+        return (
+            kyber_private.public_key().public_bytes_raw(),
+            kyber_private.private_bytes_raw(),
+            dilithium_private.public_key().public_bytes_raw(),
+            dilithium_private.private_bytes_raw()
+        )
+    
+    def _derive_key_from_seed(self, seed: bytes, purpose: bytes) -> bytes:
+        """Derive a 32-byte private key from the wallet seed (one per purpose)"""
+        return HKDF(
+            algorithm=hashes.SHA256(),
+            length=CURVE_KEY_LEN,
+            salt=None,
+            info=b"pqc-wallet " + purpose
+        ).derive(seed)
+    
+    def _derive_key_from_exchange(self, shared_secret: bytes, ephemeral_public: bytes,
+                                  recipient_public: bytes) -> bytes:
+        """Derive encryption key from an X25519 shared secret (bound to both public keys)"""
+        key_material = HKDF(
             algorithm=hashes.SHA256(),
             length=32,
-            salt=salt,
-            iterations=100000,
-            backend=default_backend()
-        )
-        return base64.urlsafe_b64encode(kdf.derive(password.encode()))
+            salt=None,
+            info=b"pqc-wallet x25519" + ephemeral_public + recipient_public
+        ).derive(shared_secret)
+        return key_material
     
     def _derive_key_from_secret(self, secret: bytes) -> bytes:
         """Derive encryption key from shared secret"""
         digest = hashes.Hash(hashes.SHA256())
         digest.update(secret)
-        key_material = digest.finalize()
-        return base64.urlsafe_b64encode(key_material)
+        return digest.finalize()
+    
+    def _cipher(self, key: bytes, legacy: bool = False) -> Union[AESGCM, Fernet]:
+        """
+        Cipher for a derived key, built once and reused for every blob it
+        handles: AES-256-GCM, or Fernet (AES) for legacy data
+        """
+        return Fernet(base64.urlsafe_b64encode(key)) if legacy else AESGCM(key)
     
-    def _encrypt_data(self, data: bytes, key: bytes) -> str:
-        """Encrypt data using Fernet (AES)"""
-        f = Fernet(key)
-        encrypted = f.encrypt(data)
+    def _unlock_cache_key(self, wallet_data: Dict, password: str) -> bytes:
+        """Unlock cache key: hash of wallet id, salt and password"""
+        return hashlib.blake2b(
+            "|".join((wallet_data.get("wallet_id", ""), wallet_data["salt"], password)).encode(),
+            digest_size=32
+        ).digest()
+    
+    def _cache_unlocked(self, wallet_data: Dict, password: str,
+                        kyber_private: bytes, dilithium_private: bytes):
+        """Remember decrypted private keys for repeat unlocks (no-op if disabled)"""
+        if _UNLOCK_CACHE is not None:
+            with _UNLOCK_CACHE_LOCK:
+                _UNLOCK_CACHE[self._unlock_cache_key(wallet_data, password)] = (kyber_private, dilithium_private)
+    
+    def _encrypt_data(self, data: bytes, cipher: AESGCM) -> str:
+        """Encrypt data using AES-256-GCM (nonce prepended)"""
+        nonce = secrets.token_bytes(NONCE_LEN)
+        encrypted = nonce + cipher.encrypt(nonce, data, None)
         return base64.b64encode(encrypted).decode('utf-8')
     
-    def _decrypt_data(self, encrypted_data: str, key: bytes) -> bytes:
-        """Decrypt data using Fernet (AES)"""
-        f = Fernet(key)
+    def _decrypt_data(self, encrypted_data: str, cipher: Union[AESGCM, Fernet]) -> bytes:
+        """Decrypt data using AES-256-GCM, or Fernet (AES) for legacy data"""
         encrypted_bytes = base64.b64decode(encrypted_data)
-        return f.decrypt(encrypted_bytes)
+        if isinstance(cipher, Fernet):
+            return cipher.decrypt(encrypted_bytes)
+        return cipher.decrypt(encrypted_bytes[:NONCE_LEN], encrypted_bytes[NONCE_LEN:], None)
     
     def _generate_wallet_id(self, public_key: bytes) -> str:
         """Generate a unique wallet ID from public key"""
-        hash_obj = hashlib.sha256(public_key)
-        return hash_obj.hexdigest()[:16].upper()
+        # 8-byte digest -> same 16 hex chars as the former truncated SHA-256
+        return hashlib.blake2b(public_key, digest_size=8).hexdigest().upper()
     
     def _generate_recovery_phrase(self, seed: bytes) -> str:
-        """Generate a 12-word recovery phrase from seed"""
-        # Simple word list (in production, use BIP39 wordlist)
-        words = [
-            "alpha", "bravo", "charlie", "delta", "echo", "foxtrot",
-            "golf", "hotel", "india", "juliet", "kilo", "lima",
-            "mike", "november", "oscar", "papa", "quebec", "romeo",
-            "sierra", "tango", "uniform", "victor", "whiskey", "xray",
-            "yankee", "zulu", "quantum", "crypto", "secure", "wallet",
-            "digital", "cipher"
-        ]
-        
-        # Convert seed to word indices
-        phrase_words = []
-        for i in range(0, 24, 2):
-            word_index = int.from_bytes(seed[i:i+2], 'big') % len(words)
-            phrase_words.append(words[word_index])
-        
-        return " ".join(phrase_words[:12])
+        """Generate a 24-word BIP39 recovery phrase encoding the whole seed"""
+        return _BIP39.to_mnemonic(seed)
     
     def _recovery_phrase_to_seed(self, phrase: str) -> bytes:
-        """Convert recovery phrase back to seed (simplified)"""
-        # In production, use proper BIP39 conversion
-        hash_obj = hashlib.sha256(phrase.encode())
-        return hash_obj.digest()
+        """Convert a BIP39 recovery phrase back to the seed (checksum verified)"""
+        words = phrase.lower().split()
+        if len(words) != 24 or not _BIP39.check(" ".join(words)):
+            raise ValueError("Invalid recovery phrase")
+        return bytes(_BIP39.to_entropy(words))
 
 
 # Global wallet service instance